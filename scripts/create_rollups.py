@@ -0,0 +1,38 @@
+"""Create and refresh the materialized rollups defined in `dataset/rollups.yaml`.
+
+Run once after `populate_db.py` (and again whenever a rollup is added). The
+API only rewrites queries onto rollups that already exist in the database, and
+refreshes them on their configured schedule.
+
+Usage (from project root):
+  python -m scripts.create_rollups
+"""
+
+from dotenv import load_dotenv
+
+load_dotenv(override=True)
+
+from src.services.engines import init_engine_registry  # noqa: E402
+from src.services.rollups import RollupRegistry  # noqa: E402
+
+
+def main():
+    engines = init_engine_registry()
+    registry = RollupRegistry.from_config(engines)
+    for database, rollups in registry.databases.items():
+        # DDL always goes to the primary, replicas follow through replication
+        conn = engines.raw_connection(database)
+        try:
+            registry.create_all(conn, database)
+            for rollup in rollups:
+                print(f"Refreshing {database}: {rollup.definition.qualified_name}")
+                registry.refresh(conn, rollup, force=True)
+        finally:
+            conn.close()
+    engines.dispose()
+
+    print(f"Rollups ready: {sorted(registry.active)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""Propose indexes for the generated queries recorded in the workload log.
+
+Reads `logs/workload.jsonl` (written by the agent's execute node), ranks
+single-column indexes on the filter and join columns of those queries by
+estimated benefit, and optionally replays the workload before/after them.
+
+Usage (from project root):
+  python -m scripts.index_advisor                  # propose only
+  python -m scripts.index_advisor --benchmark      # + replay, indexes rolled back
+  python -m scripts.index_advisor --apply          # create the indexes (+ replay)
+"""
+
+import argparse
+from collections import defaultdict
+
+from dotenv import load_dotenv
+
+load_dotenv(override=True)
+
+from src.services.engines import init_engine_registry  # noqa: E402
+from src.services.index_advisor import advise_indexes, benchmark  # noqa: E402
+from src.services.schema_loader import init_data_dictionary  # noqa: E402
+from src.services.workload import WorkloadLog  # noqa: E402
+from src.utils.consts import WORKLOAD_LOG_FILE  # noqa: E402
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--log", default=WORKLOAD_LOG_FILE, help="workload log path")
+    parser.add_argument("--top", type=int, default=5, help="indexes to propose")
+    parser.add_argument("--min-rows", type=int, default=1000, help="skip small tables")
+    parser.add_argument("--benchmark", action="store_true", help="replay the workload")
+    parser.add_argument("--repeat", type=int, default=5, help="replay runs per query")
+    parser.add_argument(
+        "--apply", action="store_true", help="create the proposed indexes"
+    )
+    return parser.parse_args()
+
+
+def advise_database(conn, database, workload, data_dict, args):
+    with conn.cursor() as cur:
+        candidates = advise_indexes(
+            cur, workload, data_dict, min_table_rows=args.min_rows
+        )[: args.top]
+    conn.rollback()
+
+    if not candidates:
+        print(f"[{database}] No index would help the logged workload")
+        return
+
+    print(f"[{database}] Proposed indexes for {len(workload)} logged executions:")
+    for rank, c in enumerate(candidates, start=1):
+        print(
+            f"{rank}. {c.index_name}: ~{c.estimated_benefit_ms:.1f} ms saved, "
+            f"{c.query_count} queries, {c.table_rows} rows, usage {c.usage}"
+        )
+        print(f"   {c.ddl(concurrently=True).as_string(conn)};")
+
+    if not (args.benchmark or args.apply):
+        return
+
+    queries = list(
+        dict.fromkeys(
+            r.sql for r in workload if r.error is None and not r.served_from_rollup
+        )
+    )
+    report = benchmark(conn, candidates, queries, args.repeat, apply=args.apply)
+    print(f"\nReplay of {len(queries)} queries (median of {args.repeat} runs):")
+    for r in report.results:
+        print(
+            f"  {r.before_ms:9.2f} ms -> {r.after_ms:9.2f} ms "
+            f"(x{r.speedup:.1f})  {r.sql[:80]}"
+        )
+    print(
+        f"Total: {report.total_before_ms:.2f} ms -> {report.total_after_ms:.2f} ms"
+        + ("" if report.applied else " (indexes rolled back)")
+    )
+
+
+def main():
+    args = parse_args()
+    workload = list(WorkloadLog(args.log))
+    if not workload:
+        print(f"No queries logged in {args.log}")
+        return
+
+    engines = init_engine_registry()
+    data_dict = init_data_dictionary(engines)
+
+    by_database = defaultdict(list)
+    for record in workload:
+        by_database[record.database or engines.default_database].append(record)
+
+    for database, records in by_database.items():
+        # Indexes are built on the primary, even for queries routed to replicas
+        conn = engines.raw_connection(database)
+        try:
+            # The bare psycopg2 connection: CREATE INDEX CONCURRENTLY toggles autocommit
+            advise_database(conn.dbapi_connection, database, records, data_dict, args)
+        finally:
+            conn.close()
+    engines.dispose()
+
+
+if __name__ == "__main__":
+    main()
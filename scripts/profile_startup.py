@@ -0,0 +1,58 @@
+"""Report the import cost of the API and of the agent graph it warms up.
+
+Runs a fresh interpreter with `python -X importtime` so numbers are cold-start
+ones, and prints the slowest top-level packages. Compare the output between
+commits to spot cold-start regressions.
+
+Usage (from project root):
+  python -m scripts.profile_startup              # what `uvicorn src.main:app` imports
+  python -m scripts.profile_startup --graph      # + the warm-up imports (langchain...)
+"""
+
+import argparse
+import subprocess
+import sys
+from collections import defaultdict
+
+
+def import_times(statement: str) -> list[tuple[str, int, int]]:
+    """(module, self us, cumulative us) for every module imported by `statement`"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    times = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, module = line.removeprefix("import time:").split("|")
+        times.append((module.strip(), int(self_us), int(cumulative_us)))
+    return times
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--graph", action="store_true", help="include the agent graph")
+    parser.add_argument("--top", type=int, default=15, help="packages to list")
+    args = parser.parse_args()
+
+    statement = "import src.main"
+    if args.graph:
+        statement += "; import src.agents.graph"
+
+    times = import_times(statement)
+    per_package = defaultdict(int)
+    for module, self_us, _ in times:
+        per_package[module.split(".")[0]] += self_us
+
+    total_ms = sum(self_us for _, self_us, _ in times) / 1000
+    print(f"`{statement}`: {len(times)} modules, {total_ms:.0f} ms")
+    slowest = sorted(per_package.items(), key=lambda p: -p[1])[: args.top]
+    for package, self_us in slowest:
+        print(f"  {package:<30} {self_us / 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""Replay calls through the model router and report hedging.
+
+Defaults to the scripted fake models of prompts/models.offline.yaml, so the
+latency tail, the hedges and the circuit breakers can be observed offline.
+Point --models at prompts/models.yaml to measure the real providers.
+
+Usage (from project root):
+  python -m scripts.simulate_hedging
+  python -m scripts.simulate_hedging --calls 200 --concurrency 8
+  python -m scripts.simulate_hedging --route result_analyzer
+"""
+
+import argparse
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from src.services.llm_router import ModelRouter  # noqa: E402
+from src.utils.consts import PROJECT_ROOT  # noqa: E402
+
+
+def timed_call(router: ModelRouter, route: str) -> float | None:
+    """Latency (ms) of one routed call, None if it failed"""
+    start = time.perf_counter()
+    try:
+        router.invoke(route, "ping")
+    except Exception as e:
+        print(f"Call failed: {e}")
+        return None
+    return (time.perf_counter() - start) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--models",
+        default=PROJECT_ROOT / "prompts" / "models.offline.yaml",
+        help="models config",
+    )
+    parser.add_argument("--route", default="sql_generator", help="route to call")
+    parser.add_argument("--calls", type=int, default=50, help="calls to make")
+    parser.add_argument("--concurrency", type=int, default=4, help="parallel calls")
+    args = parser.parse_args()
+
+    router = ModelRouter.from_config(args.models)
+    with ThreadPoolExecutor(args.concurrency) as executor:
+        latencies = list(
+            executor.map(lambda _: timed_call(router, args.route), range(args.calls))
+        )
+    router.shutdown(wait=True)  # slow primaries settle the latency saved
+
+    succeeded = sorted(ms for ms in latencies if ms is not None)
+    if len(succeeded) >= 2:
+        percentiles = statistics.quantiles(succeeded, n=100)
+        print(
+            f"\n{len(succeeded)}/{args.calls} calls answered: "
+            f"p50 {percentiles[49]:.0f} ms, p95 {percentiles[94]:.0f} ms, "
+            f"p99 {percentiles[98]:.0f} ms, max {succeeded[-1]:.0f} ms"
+        )
+
+    stats = router.stats()[args.route]
+    print(
+        f"Hedge rate {stats.hedge_rate:.0%} ({stats.hedged} hedges, "
+        f"{stats.hedge_wins} won), {stats.fallbacks} fallbacks, "
+        f"{stats.timeouts} timeouts, {stats.failures} failures"
+    )
+    print(f"Latency saved by hedges: {stats.latency_saved_ms:.0f} ms in total")
+    print(f"Answers per model: {stats.wins}")
+    print(
+        "Circuit breakers: "
+        + ", ".join(f"{name} {b.state}" for name, b in router.breakers.items())
+    )
+
+
+if __name__ == "__main__":
+    main()
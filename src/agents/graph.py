@@ -43,7 +43,3 @@ def build_graph(checkpointer: BaseCheckpointSaver | None = None) -> CompiledStat
         checkpointer = _checkpointer
 
     return graph.compile(checkpointer=checkpointer)
-
-
-def get_graph() -> CompiledStateGraph:
-    return build_graph()
@@ -1,75 +1,136 @@
-import re
+import time
+from functools import cache
 from typing import Literal
 
 import psycopg2
-from langchain.chat_models import init_chat_model
 from langchain_core.messages import AIMessage
 from langchain_core.output_parsers import JsonOutputParser
 from langgraph.graph import END
 from langgraph.types import Command, interrupt
 
-from ..services.schema_loader import init_data_dictionary
-from ..utils.consts import DB_CONNECTION_STRING, UNSAFE_SQL_KW
-from ..utils.utils import _validate_sql_syntax, load_chat_prompt_template
+from ..services.engines import (
+    EngineRegistry,
+    init_engine_registry,
+    set_statement_timeout,
+)
+from ..services.llm_router import ModelRouter, init_model_router
+from ..services.rollups import RollupRegistry, init_rollup_registry
+from ..services.schema_loader import DataDictionary
+from ..services.schema_watcher import SchemaWatcher
+from ..services.singleflight import SingleFlight, canonical_sql, normalize_question
+from ..services.workload import WorkloadLog
+from ..utils.consts import TABLES_FILE
+from ..utils.utils import (
+    _find_unsafe_keywords,
+    _validate_sql_syntax,
+    load_chat_prompt_template,
+    load_config,
+)
 from .enums import AgentStatus, Node
 from .state import State
 
-data_dict = init_data_dictionary()
+workload_log = WorkloadLog()
 
+# Concurrent sessions asking the same thing share one LLM call / DB round trip
+generation_flight = SingleFlight("generate_sql")
+execution_flight = SingleFlight("execute_sql")
 
-def generate_sql_node(state: State) -> dict:
-    """Generates SQL query from natural language using LLM"""
-    print("[NODE] SQL Generator")
+# Process-wide resources, created on first use (the app warms them up at startup)
 
-    # Get history context
-    chat_history = "\n".join(
-        f"{msg.type.upper()}: {msg.content}" for msg in state["messages"]
-    )
+
+@cache
+def get_engine_registry() -> EngineRegistry:
+    return init_engine_registry()
+
+
+@cache
+def get_schema_watcher() -> SchemaWatcher:
+    return SchemaWatcher(get_engine_registry(), load_config(TABLES_FILE))
+
+
+def get_data_dict() -> DataDictionary:
+    """Latest snapshot; the watcher swaps it when tables change"""
+    return get_schema_watcher().data_dict
+
+
+@cache
+def get_rollup_registry() -> RollupRegistry:
+    return init_rollup_registry(get_engine_registry())
+
+
+@cache
+def get_model_router() -> ModelRouter:
+    return init_model_router()
+
+
+def _generate_sql(user_query: str, chat_history: str) -> dict:
     # Get prompt
     sql_generator_prompt = load_chat_prompt_template(target_prompt="sql_generator")
 
-    # Call LLM
-    llm = init_chat_model(
-        "gemini-2.5-flash",
-        model_provider="google_genai",
-        temperature=0,
-        model_kwargs={"response_mime_type": "application/json"},
-        # model_kwargs={"response_format": "json_response"}
-    )  # .with_structured_output(method="json_mode")
+    # Call LLM (hedged across the route's models, see prompts/models.yaml)
+    llm = get_model_router().runnable("sql_generator")
 
     chain = sql_generator_prompt | llm | JsonOutputParser()
-    response = chain.invoke(
+    return chain.invoke(
         {
-            "user_query": state["user_query"],
+            "user_query": user_query,
             "chat_history": chat_history,
-            "schema_context": data_dict.format_context(),
+            "schema_context": get_data_dict().format_context(),
             # "sql_example": "" # To add later on (few-shot prompting)
         }
     )
 
-    return {**response, "status": AgentStatus.RUNNING}
+
+def generate_sql_node(state: State) -> dict:
+    """Generates SQL query from natural language using LLM"""
+    print("[NODE] SQL Generator")
+
+    # Get history context
+    chat_history = "\n".join(
+        f"{msg.type.upper()}: {msg.content}" for msg in state["messages"]
+    )
+
+    key = (
+        normalize_question(state["user_query"]),
+        chat_history,
+        get_schema_watcher().version,
+    )
+    response, coalesced = generation_flight.do(
+        key, lambda: _generate_sql(state["user_query"], chat_history)
+    )
+
+    return {
+        **response,
+        "sql_generation_coalesced": coalesced,
+        "status": AgentStatus.RUNNING,
+    }
 
 
 def validate_sql_node(state: State) -> dict:
     """Validate if the SQL"""
 
     print("[NODE] sql_validator ...", state)
-    unsafe_kw_found = []
-    for kw in UNSAFE_SQL_KW:
-        if re.search(rf"\b{kw}\b", state["generated_sql"].upper()):
-            unsafe_kw_found.append(kw)
+    unsafe_kw_found = _find_unsafe_keywords(state["generated_sql"])
 
     if unsafe_kw_found:
         print(f"SQL contains unsafe keywords ... {unsafe_kw_found}")
         ai_message = AIMessage(content="Agent run interrupted. Query unsafe !")
-        return {"messages": [ai_message], "is_safe": False}
-    else:
-        try:
-            is_valid_syntax = _validate_sql_syntax(state["generated_sql"])
-        except Exception:
-            is_valid_syntax = False
+        return {"messages": [ai_message], "ai_message": ai_message, "is_safe": False}
+
+    # Every table must live in one database (each one has its own connection pool)
+    try:
+        get_engine_registry().route(state["generated_sql"])
+    except ValueError as e:
+        print(f"SQL cannot be routed ... {e}")
+        ai_message = AIMessage(content=f"Agent run interrupted. {e}")
+        return {"messages": [ai_message], "ai_message": ai_message, "is_safe": False}
 
-        return {"is_safe": True, "is_valid_syntax": is_valid_syntax}
+    try:
+        is_valid_syntax = _validate_sql_syntax(state["generated_sql"])
+    except Exception:
+        is_valid_syntax = False
+
+    return {"is_safe": True, "is_valid_syntax": is_valid_syntax}
 
 
 def hitl_node(state: State) -> Command:
@@ -85,26 +146,68 @@ def hitl_node(state: State) -> Command:
     human_feedback = interrupt(interrupt_message)
     print("human_fdb", human_feedback)
     return Command(
-        goto=Node.EXECUTE_SQL.value if human_feedback.lower() == "y" else END
+        goto=Node.EXECUTE_SQL.value if human_feedback.lower() == "y" else END,
+        update={"human_feedback": human_feedback},
+    )
+
+
+def _execute_sql(
+    query: str, database: str
+) -> tuple[list | None, str | None, str | None]:
+    """Rows of `query` (from a rollup when one can serve it), that rollup, and the error"""
+    res, served_from_rollup, error = None, None, None
+    start = time.perf_counter()
+    try:
+        _, engine = get_engine_registry().engine_for(query, database)
+        conn = engine.raw_connection()
+    except Exception as e:
+        print(f"Cannot connect to db: {e}")
+        error = f"Cannot connect to the {database} database: {e}"
+    else:
+        with conn.cursor() as cur:
+            try:
+                set_statement_timeout(cur)
+                rollup_result = get_rollup_registry().try_execute(cur, query, database)
+                if rollup_result is not None:
+                    res, served_from_rollup = rollup_result
+                else:
+                    cur.execute(query)
+                    res = cur.fetchall()
+            except (Exception, psycopg2.DatabaseError) as e:
+                print(e)
+                error = str(e)
+        conn.close()  # back to the pool
+
+    workload_log.record(
+        query,
+        database=database,
+        elapsed_ms=(time.perf_counter() - start) * 1000,
+        row_count=len(res) if error is None else None,
+        served_from_rollup=served_from_rollup,
+        error=error,
     )
+    return res, served_from_rollup, error
 
 
 def execute_sql_node(state: State) -> dict:
     """Excute the generated sql query"""
     print("[NODE] execute SQL query")
+    query = state["generated_sql"]
     try:
-        conn = psycopg2.connect(DB_CONNECTION_STRING)
-    except Exception as e:
-        print(f"Cannot connect to db: {e}")
+        database = get_engine_registry().route(query)
+    except ValueError as e:  # e.g. tables of several databases
+        print(e)
+        return {"sql_execution_result": f"Query failed: {e}"}
 
-    with conn.cursor() as cur:
-        try:
-            cur.execute(state["generated_sql"])
-            res = cur.fetchall()
-        except (Exception, psycopg2.DatabaseError) as e:
-            print(e)
+    (res, served_from_rollup, error), coalesced = execution_flight.do(
+        (database, canonical_sql(query)), lambda: _execute_sql(query, database)
+    )
 
-    return {"sql_execution_result": str(res)}
+    return {
+        "sql_execution_result": str(res) if error is None else f"Query failed: {error}",
+        "served_from_rollup": served_from_rollup,
+        "sql_execution_coalesced": coalesced,
+    }
 
 
 def render_message_node(state: State) -> dict:
@@ -112,13 +215,7 @@ def render_message_node(state: State) -> dict:
     print("[NODE] render message")
 
     # Call LLM
-    llm = init_chat_model(
-        "gemini-2.5-flash",
-        model_provider="google_genai",
-        temperature=0,
-        # model_kwargs={"response_mime_type": "application/json"},
-        # model_kwargs={"response_format": "json_response"}
-    )  # .with_structured_output(method="json_mode")
+    llm = get_model_router().runnable("result_analyzer")
 
     # Get prompt
     sql_generator_prompt = load_chat_prompt_template(target_prompt="result_analyzer")
@@ -0,0 +1,159 @@
+import asyncio
+import sys
+import time
+from contextlib import contextmanager
+
+from pydantic import BaseModel
+
+# Backoff between warm-up attempts (e.g. the database is not up yet at boot)
+_RETRY_DELAY_S = 1.0
+_MAX_RETRY_DELAY_S = 60.0
+
+
+class StartupStep(BaseModel):
+    name: str
+    elapsed_ms: float
+    modules_imported: int
+
+
+class StartupProfile(BaseModel):
+    """Where the cold start time goes"""
+
+    steps: list[StartupStep] = []
+
+    @property
+    def total_ms(self) -> float:
+        return sum(step.elapsed_ms for step in self.steps)
+
+    def report(self) -> str:
+        lines = [f"Startup profile ({self.total_ms:.0f} ms):"]
+        for step in self.steps:
+            lines.append(
+                f"  {step.name:<28} {step.elapsed_ms:9.1f} ms  "
+                f"(+{step.modules_imported} modules)"
+            )
+        return "\n".join(lines)
+
+
+class AgentRuntime:
+    """Holds the compiled graph, built once per process.
+
+    The graph and the resources its nodes share (connection pools, data dictionary,
+    rollups) are built by a background warm-up started from the app lifespan. Only
+    lightweight modules are imported here, so the API serves readiness probes
+    before langchain/langgraph are loaded. A failed warm-up is retried in the
+    background with exponential backoff until it succeeds.
+    """
+
+    def __init__(self):
+        self.graph = None
+        self.error: BaseException | None = None  # of the last failed attempt
+        self.attempts = 0
+        self.profile = StartupProfile()
+        self._warmup: asyncio.Task | None = None  # retry loop
+        self._attempt: asyncio.Future | None = None  # current build
+        self._build_steps_from = 0
+
+    @contextmanager
+    def profile_step(self, name: str):
+        modules, start = len(sys.modules), time.perf_counter()
+        try:
+            yield
+        finally:
+            self.profile.steps.append(
+                StartupStep(
+                    name=name,
+                    elapsed_ms=(time.perf_counter() - start) * 1000,
+                    modules_imported=len(sys.modules) - modules,
+                )
+            )
+
+    @property
+    def is_ready(self) -> bool:
+        return self.graph is not None
+
+    @property
+    def status(self) -> str:
+        if self.is_ready:
+            return "ready"
+        if self.error is not None:
+            return "retrying"
+        return "warming up" if self._warmup is not None else "not started"
+
+    def _build(self):
+        """Heavy imports, schema reflection and graph compilation (runs in a thread)"""
+        del self.profile.steps[self._build_steps_from :]  # steps of a failed attempt
+        with self.profile_step("import agent graph"):
+            from . import nodes
+            from .graph import build_graph
+
+        with self.profile_step("create connection pools"):
+            nodes.get_engine_registry()
+        with self.profile_step("reflect data dictionary"):
+            nodes.get_schema_watcher().start()
+        with self.profile_step("load rollups"):
+            nodes.get_rollup_registry().start_scheduler()
+        with self.profile_step("create model router"):
+            nodes.get_model_router()
+        with self.profile_step("compile graph"):
+            graph = build_graph()
+
+        self.graph = graph
+        print(self.profile.report())
+
+    def _start_attempt(self) -> asyncio.Future:
+        self.attempts += 1
+        return asyncio.ensure_future(asyncio.to_thread(self._build))
+
+    async def _run_warmup(self):
+        delay = _RETRY_DELAY_S
+        while True:
+            try:
+                # Shielded: cancelling the retry loop must not orphan a running build
+                await asyncio.shield(self._attempt)
+                self.error = None
+                return
+            except Exception as e:
+                print(f"Agent warm-up failed, retrying in {delay:.0f}s: {e}")
+                self.error = e
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, _MAX_RETRY_DELAY_S)
+            self._attempt = self._start_attempt()
+
+    def start_warmup(self) -> asyncio.Task:
+        if self._warmup is None:
+            self._build_steps_from = len(self.profile.steps)
+            self._attempt = self._start_attempt()
+            self._warmup = asyncio.create_task(self._run_warmup())
+        return self._warmup
+
+    async def get_graph(self):
+        """The compiled graph, waiting for the current warm-up attempt.
+
+        Raises the attempt's error when it failed; the next one is already scheduled.
+        """
+        if self.graph is None:
+            self.start_warmup()
+            await asyncio.shield(self._attempt)
+        return self.graph
+
+    async def shutdown(self):
+        if self._warmup is not None and not self._warmup.done():
+            self._warmup.cancel()
+            await asyncio.gather(self._warmup, self._attempt, return_exceptions=True)
+
+        # Stop whatever the warm-up started, even if it failed partway
+        nodes = sys.modules.get(f"{__package__}.nodes")
+        if nodes is None:
+            return
+        for getter, close in (
+            (nodes.get_rollup_registry, lambda registry: registry.stop_scheduler()),
+            (nodes.get_schema_watcher, lambda watcher: watcher.stop()),
+            (nodes.get_engine_registry, lambda engines: engines.dispose()),
+            (nodes.get_model_router, lambda router: router.shutdown()),
+        ):
+            if getter.cache_info().currsize:  # created, not created on the way out
+                close(getter())
+
+
+runtime = AgentRuntime()
@@ -16,6 +16,7 @@ class State(TypedDict):
     # Generation node state
     generated_sql: str | None = None
     sql_explanation: str | None = None
+    sql_generation_coalesced: bool = False
 
     # Validation node state
     is_safe: bool | None = None
@@ -26,6 +27,8 @@ class State(TypedDict):
 
     # SQL execution node state
     sql_execution_result: str | None = None
+    served_from_rollup: str | None = None
+    sql_execution_coalesced: bool = False
     ai_message: AIMessage | None = None
 
 
@@ -1,15 +1,16 @@
+from importlib.util import find_spec
 from uuid import uuid4
 
 from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException
-from langchain_core.messages import BaseMessage, HumanMessage
-from langgraph.graph.state import CompiledStateGraph
-from langgraph.types import Command
+from fastapi.responses import StreamingResponse
 
-from ..agents.enums import AgentStatus
-from ..agents.graph import get_graph
-from ..agents.state import get_initial_state
+from ..agents.enums import AgentStatus, Node
+from ..services.export import MEDIA_TYPES, ExportFormat, export_log, stream_export
+from .dependencies import get_graph
 from .schemas import (
     ChatRequest,
+    CoalescingStatsResponse,
+    ExportStatsResponse,
     GetStatusResponse,
     PostStatusResponse,
     ResumeRequest,
@@ -19,9 +20,12 @@ from .schemas import (
 chat_router = APIRouter(prefix="/chat")
 
 
-async def run_agent(graph, user_query: BaseMessage, session_id: str):
+async def run_agent(graph, user_query: str, session_id: str):
+    # langchain/langgraph modules are only loaded once the graph is warmed up
+    from ..agents.state import get_initial_state
+
     initial_state = get_initial_state(
-        messages=[], query=user_query.content
+        messages=[], query=user_query
     )  # OEM: No msg history handled for now
 
     config = {"configurable": {"thread_id": session_id}}
@@ -31,6 +35,8 @@ async def run_agent(graph, user_query: BaseMessage, session_id: str):
 
 
 async def resume_execution(graph, resume_data: str | dict, config: dict):
+    from langgraph.types import Command
+
     return await graph.ainvoke(Command(resume=resume_data), config=config)
 
 
@@ -38,14 +44,12 @@ async def resume_execution(graph, resume_data: str | dict, config: dict):
 async def create_session(
     request: ChatRequest,
     background_task: BackgroundTasks,
-    graph: CompiledStateGraph = Depends(get_graph),
+    graph=Depends(get_graph),
 ):
     """Chat endpoint that processes user messages through the NL2SQL agent."""
 
     session_id = request.session_id or str(uuid4())
-    background_task.add_task(
-        run_agent, graph, HumanMessage(content=request.message), session_id
-    )
+    background_task.add_task(run_agent, graph, request.message, session_id)
 
     return {
         "session_id": session_id,
@@ -53,10 +57,19 @@ async def create_session(
     }
 
 
+@chat_router.get("/coalescing", response_model=CoalescingStatsResponse)
+async def get_coalescing_stats(graph=Depends(get_graph)):
+    """How many LLM calls and DB round trips concurrent sessions shared"""
+    from ..agents.nodes import execution_flight, generation_flight
+
+    return {
+        "generate_sql": generation_flight.stats,
+        "execute_sql": execution_flight.stats,
+    }
+
+
 @chat_router.get("/{session_id}/status", response_model=GetStatusResponse)
-async def get_session_status(
-    session_id: str, graph: CompiledStateGraph = Depends(get_graph)
-):
+async def get_session_status(session_id: str, graph=Depends(get_graph)):
     config = {"configurable": {"thread_id": session_id}}
     graph_state = graph.get_state(config)
     if not graph_state.values:  # TODO: (REMINDER) check for a better way
@@ -69,17 +82,25 @@ async def get_session_status(
         else graph_state.values.get("status", AgentStatus.INITIALIZED)
     )
 
+    coalesced_nodes = [
+        node.value
+        for node, field in (
+            (Node.GENERATE_SQL, "sql_generation_coalesced"),
+            (Node.EXECUTE_SQL, "sql_execution_coalesced"),
+        )
+        if graph_state.values.get(field)
+    ]
+
     return {
         "session_id": session_id,
         "status": status,
         "is_awaiting_approval": len(graph_state.interrupts) > 0,
+        "coalesced_nodes": coalesced_nodes,
     }
 
 
 @chat_router.get("/{session_id}/approval")
-async def get_pending_approval(
-    session_id: str, graph: CompiledStateGraph = Depends(get_graph)
-):
+async def get_pending_approval(session_id: str, graph=Depends(get_graph)):
     config = {"configurable": {"thread_id": session_id}}
     graph_state = graph.get_state(config)
 
@@ -121,3 +142,53 @@ async def get_session_results(session_id: str, graph=Depends(get_graph)):
         "status": AgentStatus.DONE,
         "model_response": graph_state.values["ai_message"].content,
     }
+
+
+@chat_router.get("/{session_id}/export")
+async def export_results(
+    session_id: str,
+    format: ExportFormat = ExportFormat.CSV,
+    graph=Depends(get_graph),
+):
+    """Stream the full result of the session's approved query as a file"""
+    from ..agents.nodes import get_engine_registry
+    from ..utils.utils import _find_unsafe_keywords, _validate_sql_syntax
+
+    graph_state = graph.get_state({"configurable": {"thread_id": session_id}})
+    if not graph_state.values:
+        raise HTTPException(404, detail=f"session with id: ({session_id}) not found")
+    if (graph_state.values.get("human_feedback") or "").lower() != "y":
+        raise HTTPException(409, detail="The session's query has not been approved")
+
+    # Same guards as the agent's validation node
+    query = graph_state.values["generated_sql"]
+    if _find_unsafe_keywords(query):
+        raise HTTPException(400, detail="Query unsafe !")
+    try:
+        _validate_sql_syntax(query)
+    except Exception as e:
+        raise HTTPException(400, detail=f"Invalid query: {e}") from e
+
+    if format != ExportFormat.CSV and find_spec("pyarrow") is None:
+        raise HTTPException(501, detail=f"{format.value} export requires pyarrow")
+
+    try:
+        _, engine = get_engine_registry().engine_for(query)
+    except ValueError as e:  # e.g. tables of several databases
+        raise HTTPException(400, detail=f"Invalid query: {e}") from e
+    return StreamingResponse(
+        stream_export(engine, query, format, session_id),
+        media_type=MEDIA_TYPES[format],
+        headers={
+            "Content-Disposition": f'attachment; filename="{session_id}.{format.value}"'
+        },
+    )
+
+
+@chat_router.get("/{session_id}/exports", response_model=ExportStatsResponse)
+async def get_export_stats(session_id: str):
+    """Rows, bytes and rows/sec of the session's finished exports"""
+    return {
+        "session_id": session_id,
+        "exports": [e for e in export_log if e.session_id == session_id],
+    }
@@ -0,0 +1,25 @@
+from fastapi import HTTPException
+
+from ..agents.runtime import runtime
+
+
+async def get_graph():
+    """The process-wide compiled graph (waits for the startup warm-up)"""
+    try:
+        return await runtime.get_graph()
+    except Exception as e:
+        raise HTTPException(503, detail=f"Agent unavailable: {e}") from e
+
+
+async def get_rollup_registry():
+    await get_graph()
+    from ..agents.nodes import get_rollup_registry
+
+    return get_rollup_registry()
+
+
+async def get_model_router():
+    await get_graph()
+    from ..agents.nodes import get_model_router
+
+    return get_model_router()
@@ -0,0 +1,21 @@
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+
+from ..agents.runtime import runtime
+
+health_router = APIRouter()
+
+
+@health_router.get("/ready")
+async def get_readiness():
+    """503 until the graph is compiled and the schema reflected, with the startup profile"""
+    return JSONResponse(
+        status_code=200 if runtime.is_ready else 503,
+        content={
+            "status": runtime.status,
+            "error": str(runtime.error) if runtime.error else None,
+            "warmup_attempts": runtime.attempts,
+            "startup_ms": runtime.profile.total_ms,
+            "startup_profile": runtime.profile.model_dump()["steps"],
+        },
+    )
@@ -0,0 +1,17 @@
+from fastapi import APIRouter, Depends
+
+from .dependencies import get_model_router
+from .schemas import ModelRoutingResponse
+
+models_router = APIRouter(prefix="/models")
+
+
+@models_router.get("/routing", response_model=ModelRoutingResponse)
+async def get_model_routing(router=Depends(get_model_router)):
+    """Hedge rate, latency saved and failures per route, and each model's breaker"""
+    return {
+        "routes": {name: stats.model_dump() for name, stats in router.stats().items()},
+        "circuit_breakers": {
+            name: breaker.state for name, breaker in router.breakers.items()
+        },
+    }
@@ -0,0 +1,16 @@
+from fastapi import APIRouter, Depends
+
+from .dependencies import get_rollup_registry
+from .schemas import RollupUsageResponse
+
+rollups_router = APIRouter(prefix="/rollups")
+
+
+@rollups_router.get("/usage", response_model=RollupUsageResponse)
+async def get_rollup_usage(limit: int = 50, registry=Depends(get_rollup_registry)):
+    """Which generated queries were served from rollups, and the estimated speedup"""
+    return {
+        "active_rollups": sorted(registry.active),
+        "summary": registry.usage_summary(),
+        "recent": [usage.model_dump() for usage in list(registry.usage)[-limit:]],
+    }
@@ -1,6 +1,10 @@
+from typing import Any
+
 from pydantic import BaseModel
 
 from ..agents.enums import AgentStatus
+from ..services.export import ExportStats
+from ..services.singleflight import FlightStats
 
 
 class ChatRequest(BaseModel):
@@ -33,6 +37,7 @@ class GetStatusResponse(BaseStatusResponse):
     """Status once the agentic workflow kicks out"""
 
     is_awaiting_approval: bool
+    coalesced_nodes: list[str] = []
 
 
 class ApprovalStatusResponse(GetStatusResponse):
@@ -45,3 +50,32 @@ class SessionResult(BaseStatusResponse):
     """Final result of the session run"""
 
     model_response: str
+
+
+class RollupUsageResponse(BaseModel):
+    """Queries served from materialized rollups"""
+
+    active_rollups: list[str]
+    summary: dict[str, dict]
+    recent: list[dict[str, Any]]
+
+
+class ExportStatsResponse(BaseModel):
+    """Throughput of the exports of a session"""
+
+    session_id: str
+    exports: list[ExportStats]
+
+
+class CoalescingStatsResponse(BaseModel):
+    """Calls shared between concurrent sessions since startup"""
+
+    generate_sql: FlightStats
+    execute_sql: FlightStats
+
+
+class ModelRoutingResponse(BaseModel):
+    """Hedging, fallbacks and circuit breakers of the LLM routes"""
+
+    routes: dict[str, dict]
+    circuit_breakers: dict[str, str]
@@ -1,16 +1,35 @@
+from contextlib import asynccontextmanager
+
 from dotenv import load_dotenv
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 load_dotenv(override=True)
 
-from .api.chat import chat_router
+from .agents.runtime import runtime
+
+with runtime.profile_step("import API"):
+    from .api.chat import chat_router
+    from .api.health import health_router
+    from .api.models import models_router
+    from .api.rollups import rollups_router
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Heavy imports, schema reflection and graph compilation run in the background;
+    # /ready reports when they are done
+    runtime.start_warmup()
+    yield
+    await runtime.shutdown()
+
 
 app = FastAPI(
     title="NL2SQL Agent API",
     description="A RAG-powered AI agent that translates natural langugae into SQL for live db querying",
     version="0.1.0",
     docs_url="/docs",
+    lifespan=lifespan,
 )
 
 app.add_middleware(
@@ -21,4 +40,7 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+app.include_router(health_router)
 app.include_router(chat_router)
+app.include_router(rollups_router)
+app.include_router(models_router)
@@ -0,0 +1,170 @@
+import itertools
+import os
+import re
+import threading
+
+import sqlalchemy as sa
+from sqlalchemy.engine import Engine
+from sqlglot import exp, parse_one
+
+from ..utils.consts import (
+    DB_CONNECTION_STRING,
+    DB_MAX_OVERFLOW,
+    DB_POOL_SIZE,
+    SQL_STATEMENT_TIMEOUT_MS,
+    TABLES_FILE,
+)
+from ..utils.utils import load_config
+
+
+def _env_prefix(database: str) -> str:
+    return re.sub(r"\W", "_", database).upper()
+
+
+def database_urls(database: str, is_default: bool) -> tuple[str, list[str]]:
+    """Primary and replica URLs of a database from `<DB>_URL` / `<DB>_REPLICA_URLS`.
+
+    Without `<DB>_URL`, the default database uses DB_CONNECTION_STRING and the
+    others the same server with their own database name.
+    """
+    prefix = _env_prefix(database)
+    url = os.getenv(f"{prefix}_URL")
+    if url is None:
+        url = (
+            DB_CONNECTION_STRING
+            if is_default
+            else sa.engine.make_url(DB_CONNECTION_STRING)
+            .set(database=database)
+            .render_as_string(hide_password=False)
+        )
+    replicas = [
+        u.strip()
+        for u in os.getenv(f"{prefix}_REPLICA_URLS", "").split(",")
+        if u.strip()
+    ]
+    return url, replicas
+
+
+def set_statement_timeout(cursor, timeout_ms: int = SQL_STATEMENT_TIMEOUT_MS):
+    """Bound generated queries for the current transaction only (pooled connections)"""
+    cursor.execute("SET LOCAL statement_timeout = %s", (int(timeout_ms),))
+
+
+def is_analytic_query(query: str) -> bool:
+    """Heavy read: aggregates, windows or a multi-way join"""
+    try:
+        parsed = parse_one(query, read="postgres")
+    except Exception:
+        return False
+    return (
+        parsed.find(exp.Group, exp.AggFunc, exp.Window) is not None
+        or len(list(parsed.find_all(exp.Join))) >= 2
+    )
+
+
+class DatabaseEngines:
+    """Pooled engines of one configured database: its primary and read replicas"""
+
+    def __init__(self, name: str, url: str, replica_urls: list[str], **engine_kwargs):
+        self.name = name
+        self.primary = sa.create_engine(url, **engine_kwargs)
+        self.replicas = [sa.create_engine(u, **engine_kwargs) for u in replica_urls]
+        self._replica_cycle = itertools.cycle(self.replicas)
+        self._lock = threading.Lock()
+
+    def engine(self, analytic: bool = False) -> Engine:
+        """Round-robin analytic queries over the replicas, everything else on the primary"""
+        if analytic and self.replicas:
+            with self._lock:
+                return next(self._replica_cycle)
+        return self.primary
+
+    def dispose(self):
+        for engine in [self.primary, *self.replicas]:
+            engine.dispose()
+
+
+class EngineRegistry:
+    """One connection pool set per database of `tables.yaml`, and query routing"""
+
+    def __init__(self, databases: dict[str, DatabaseEngines], tables_config: dict):
+        if not databases:
+            raise ValueError("At least one database must be configured")
+        self.databases = databases
+        self.default_database = next(iter(databases))
+
+        self._tables: dict[str, str] = {}
+        schemas: dict[str, set[str]] = {}
+        for db_name, db_schemas in tables_config.items():
+            for schema_name, tables in (db_schemas or {}).items():
+                schemas.setdefault(schema_name.lower(), set()).add(db_name)
+                for table in tables or []:
+                    self._tables[f"{schema_name}.{table}".lower()] = db_name
+        # Schemas living in a single database route their unlisted tables (e.g. rollups)
+        self._schemas = {
+            s: next(iter(dbs)) for s, dbs in schemas.items() if len(dbs) == 1
+        }
+
+    @classmethod
+    def from_config(cls, tables_file=TABLES_FILE) -> "EngineRegistry":
+        tables_config = load_config(tables_file)
+        databases = {}
+        for i, db_name in enumerate(tables_config):
+            url, replica_urls = database_urls(db_name, is_default=(i == 0))
+            databases[db_name] = DatabaseEngines(
+                db_name,
+                url,
+                replica_urls,
+                pool_size=DB_POOL_SIZE,
+                max_overflow=DB_MAX_OVERFLOW,
+                pool_pre_ping=True,
+            )
+        return cls(databases, tables_config)
+
+    def database_for_tables(self, tables: set[str]) -> str:
+        """Database holding every "schema.table" of `tables`"""
+        matches = set()
+        for table in tables:
+            table = table.lower()
+            database = self._tables.get(table) or self._schemas.get(
+                table.split(".", 1)[0]
+            )
+            if database is not None:
+                matches.add(database)
+
+        if len(matches) > 1:
+            raise ValueError(f"Query spans several databases: {sorted(matches)}")
+        return matches.pop() if matches else self.default_database
+
+    def route(self, query: str) -> str:
+        """Database a generated query must run on, from the tables it references"""
+        try:
+            parsed = parse_one(query, read="postgres")
+        except Exception:
+            return self.default_database
+
+        ctes = {cte.alias_or_name.lower() for cte in parsed.find_all(exp.CTE)}
+        tables = {
+            f"{t.db}.{t.name}" if t.db else f"public.{t.name}"
+            for t in parsed.find_all(exp.Table)
+            if t.name and t.name.lower() not in ctes
+        }
+        return self.database_for_tables(tables)
+
+    def engine_for(self, query: str, database: str | None = None) -> tuple[str, Engine]:
+        """Database and engine to run `query` on (routed unless `database` is given)"""
+        database = database or self.route(query)
+        return database, self.databases[database].engine(is_analytic_query(query))
+
+    def raw_connection(self, database: str | None = None):
+        """Pooled DBAPI connection to a primary; close() hands it back to the pool"""
+        database = database or self.default_database
+        return self.databases[database].primary.raw_connection()
+
+    def dispose(self):
+        for database in self.databases.values():
+            database.dispose()
+
+
+def init_engine_registry() -> EngineRegistry:
+    return EngineRegistry.from_config(TABLES_FILE)
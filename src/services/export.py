@@ -0,0 +1,263 @@
+import queue
+import threading
+import time
+from collections import deque
+from collections.abc import Iterator
+from datetime import datetime, timezone
+from decimal import Decimal
+from enum import Enum
+from typing import TYPE_CHECKING
+from uuid import uuid4
+
+from pydantic import BaseModel
+
+if TYPE_CHECKING:  # keep the API import light, see AgentRuntime
+    from sqlalchemy.engine import Engine
+
+_CHUNK_BYTES = 64 * 1024
+_QUEUED_CHUNKS = 16  # at most ~1 MiB of CSV buffered between the DB and the client
+_BATCH_ROWS = 50_000
+
+
+class ExportFormat(str, Enum):
+    CSV = "csv"
+    ARROW = "arrow"
+    PARQUET = "parquet"
+
+
+MEDIA_TYPES = {
+    ExportFormat.CSV: "text/csv",
+    ExportFormat.ARROW: "application/vnd.apache.arrow.stream",
+    ExportFormat.PARQUET: "application/vnd.apache.parquet",
+}
+
+
+class ExportStats(BaseModel):
+    """Throughput of one export, recorded once the stream ends"""
+
+    session_id: str
+    format: ExportFormat
+    rows: int = 0
+    bytes: int = 0
+    elapsed_s: float = 0.0
+    rows_per_sec: float = 0.0
+    finished_at: datetime | None = None
+    error: str | None = None
+
+
+export_log: deque[ExportStats] = deque(maxlen=1000)
+
+
+class _ExportCancelled(Exception):
+    """The client went away while COPY was still producing rows"""
+
+
+class _ChunkSink:
+    """Write-only file object buffering bytes until the stream drains them"""
+
+    def __init__(self):
+        self._buffer = bytearray()
+        self._position = 0
+        self.closed = False
+
+    def write(self, data: bytes | str) -> int:
+        if isinstance(data, str):
+            data = data.encode()
+        self._buffer += data
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self):
+        pass
+
+    def __len__(self) -> int:
+        return len(self._buffer)
+
+    def drain(self) -> bytes:
+        data = bytes(self._buffer)
+        self._buffer.clear()
+        return data
+
+
+class _QueueSink(_ChunkSink):
+    """Hands COPY output to the response in ~64 KiB chunks through a bounded queue"""
+
+    def __init__(self, chunks: queue.Queue, cancelled: threading.Event):
+        super().__init__()
+        self._chunks = chunks
+        self._cancelled = cancelled
+
+    def put(self, item):
+        while True:
+            if self._cancelled.is_set():
+                raise _ExportCancelled()
+            try:
+                self._chunks.put(item, timeout=0.5)
+                return
+            except queue.Full:
+                continue
+
+    def write(self, data: bytes | str) -> int:
+        written = super().write(data)
+        if len(self) >= _CHUNK_BYTES:
+            self.put(self.drain())
+        return written
+
+
+def _strip_terminator(query: str) -> str:
+    return query.strip().rstrip(";").strip()
+
+
+def _stream_csv(conn, query: str, stats: ExportStats) -> Iterator[bytes]:
+    """COPY ... TO STDOUT in a worker thread, streamed through a bounded queue"""
+    from .engines import set_statement_timeout
+
+    chunks: queue.Queue = queue.Queue(maxsize=_QUEUED_CHUNKS)
+    cancelled = threading.Event()
+    sink = _QueueSink(chunks, cancelled)
+    done = object()
+
+    def produce():
+        try:
+            with conn.cursor() as cur:
+                set_statement_timeout(cur)
+                cur.copy_expert(
+                    f"COPY ({_strip_terminator(query)}) TO STDOUT WITH (FORMAT csv, HEADER)",
+                    sink,
+                )
+                stats.rows = cur.rowcount
+            sink.put(sink.drain())
+            sink.put(done)
+        except _ExportCancelled:
+            pass
+        except Exception as e:
+            try:
+                sink.put(e)
+            except _ExportCancelled:
+                pass
+
+    producer = threading.Thread(target=produce, name="csv-export", daemon=True)
+    producer.start()
+    try:
+        while (item := chunks.get()) is not done:
+            if isinstance(item, Exception):
+                raise item
+            stats.bytes += len(item)
+            yield item
+    finally:
+        if producer.is_alive():
+            cancelled.set()
+            conn.cancel()  # stop the server side of an abandoned COPY
+        producer.join(timeout=5)
+        if producer.is_alive():
+            # Still inside COPY: keep the connection out of the pool for good
+            conn.invalidate()
+
+
+def _arrow_type(pa, column):
+    """Arrow type of a Postgres result column (text for anything unmapped)"""
+    if column.type_code == 1700:  # numeric
+        # Exact only with a declared precision, e.g. NUMERIC(12, 2)
+        if column.precision is not None and column.precision <= 38:
+            return pa.decimal128(column.precision, column.scale or 0)
+        return pa.string()
+    return {
+        16: pa.bool_(),
+        20: pa.int64(),
+        21: pa.int16(),
+        23: pa.int32(),
+        700: pa.float32(),
+        701: pa.float64(),
+        1082: pa.date32(),
+        1114: pa.timestamp("us"),
+        1184: pa.timestamp("us", tz="UTC"),
+    }.get(column.type_code, pa.string())
+
+
+def _text(value):
+    if value is None or isinstance(value, str):
+        return value
+    if isinstance(value, Decimal):
+        return format(value, "f")  # as Postgres prints it, not 1E-30
+    return str(value)
+
+
+def _record_batch(pa, rows: list[tuple], schema):
+    arrays = []
+    for values, field in zip(zip(*rows), schema):
+        if pa.types.is_string(field.type):
+            values = [_text(v) for v in values]
+        arrays.append(pa.array(values, type=field.type))
+    return pa.record_batch(arrays, schema=schema)
+
+
+def _stream_batches(
+    conn, query: str, export_format: ExportFormat, stats: ExportStats
+) -> Iterator[bytes]:
+    """Server-side cursor read in batches, each written as Arrow IPC / a Parquet row group"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    from .engines import set_statement_timeout
+
+    with conn.cursor() as cur:
+        set_statement_timeout(cur)
+
+    # Named cursor: Postgres keeps the result, only one batch is held in memory
+    with conn.cursor(name=f"export_{uuid4().hex}") as cur:
+        cur.execute(query)
+        rows = cur.fetchmany(_BATCH_ROWS)
+        schema = pa.schema(
+            [(col.name, _arrow_type(pa, col)) for col in cur.description]
+        )
+        sink = _ChunkSink()
+        writer = (
+            pa.ipc.new_stream(sink, schema)
+            if export_format == ExportFormat.ARROW
+            else pq.ParquetWriter(sink, schema)
+        )
+        try:
+            while rows:
+                writer.write_batch(_record_batch(pa, rows, schema))
+                stats.rows += len(rows)
+                chunk = sink.drain()
+                stats.bytes += len(chunk)
+                yield chunk
+                rows = cur.fetchmany(_BATCH_ROWS)
+        finally:
+            writer.close()
+        chunk = sink.drain()
+        stats.bytes += len(chunk)
+        yield chunk
+
+
+def stream_export(
+    engine: "Engine", query: str, export_format: ExportFormat, session_id: str
+) -> Iterator[bytes]:
+    """Stream the full result of `query` in `export_format` with bounded memory"""
+    stats = ExportStats(session_id=session_id, format=export_format)
+    conn = engine.raw_connection()
+    start = time.perf_counter()
+    try:
+        if export_format == ExportFormat.CSV:
+            yield from _stream_csv(conn, query, stats)
+        else:
+            yield from _stream_batches(conn, query, export_format, stats)
+    except Exception as e:
+        stats.error = str(e)
+        raise
+    finally:
+        # Back to the pool, which rolls the transaction back (no-op once invalidated)
+        conn.close()
+        stats.elapsed_s = time.perf_counter() - start
+        stats.rows_per_sec = stats.rows / stats.elapsed_s if stats.elapsed_s else 0.0
+        stats.finished_at = datetime.now(timezone.utc)
+        export_log.append(stats)
+        print(
+            f"Export {session_id} ({export_format.value}): {stats.rows} rows, "
+            f"{stats.bytes} bytes in {stats.elapsed_s:.2f}s "
+            f"({stats.rows_per_sec:,.0f} rows/s)"
+        )
@@ -0,0 +1,50 @@
+import threading
+import time
+from typing import Any
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from pydantic import BaseModel, PrivateAttr
+
+
+class ScriptStep(BaseModel):
+    """One scripted call: how long it takes, then its answer or its error"""
+
+    latency_s: float = 0.0
+    response: str = ""
+    error: str | None = None
+
+
+class ScriptedChatModel(BaseChatModel):
+    """Offline chat model replaying its script, one step per call (cycled).
+
+    Lets the model router's hedging, deadlines and circuit breakers be exercised
+    without network access (`model_provider: fake` in the models config).
+    """
+
+    script: list[ScriptStep]
+    _calls: int = PrivateAttr(default=0)
+    _lock: threading.Lock = PrivateAttr(default_factory=threading.Lock)
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted"
+
+    def _generate(
+        self,
+        messages: list[BaseMessage],
+        stop: list[str] | None = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        with self._lock:
+            step = self.script[self._calls % len(self.script)]
+            self._calls += 1
+
+        time.sleep(step.latency_s)
+        if step.error is not None:
+            raise RuntimeError(step.error)
+        return ChatResult(
+            generations=[ChatGeneration(message=AIMessage(content=step.response))]
+        )
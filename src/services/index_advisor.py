@@ -0,0 +1,324 @@
+import statistics
+import time
+from collections import defaultdict
+from typing import Literal
+
+from psycopg2 import sql
+from pydantic import BaseModel
+from sqlglot import exp, parse_one
+
+from ..utils.utils import _conjuncts, _from_clause
+from .schema_loader import DataDictionary
+from .workload import WorkloadRecord
+
+PredicateKind = Literal["join", "equality", "range"]
+
+# How much of a sequential scan an index on the column is expected to remove
+_KIND_WEIGHTS: dict[PredicateKind, float] = {
+    "join": 1.0,
+    "equality": 1.0,
+    "range": 0.5,
+}
+# LIKE is left out: a default btree index only serves it for left-anchored
+# patterns under the C collation
+_EQUALITY_PREDICATES = (exp.EQ, exp.In)
+_RANGE_PREDICATES = (exp.GT, exp.GTE, exp.LT, exp.LTE, exp.Between)
+
+
+class IndexCandidate(BaseModel):
+    """A single-column index proposed from the logged workload"""
+
+    schema_name: str
+    table: str
+    column: str
+    usage: dict[str, int]  # predicate kind -> number of logged executions
+    query_count: int
+    workload_ms: float  # logged time of the queries that filter/join on the column
+    estimated_benefit_ms: float
+    table_rows: int
+
+    @property
+    def index_name(self) -> str:
+        return f"idx_{self.table}_{self.column}"[:63]
+
+    def ddl(self, concurrently: bool = False) -> sql.Composed:
+        return sql.SQL("CREATE INDEX {}IF NOT EXISTS {} ON {} ({})").format(
+            sql.SQL("CONCURRENTLY " if concurrently else ""),
+            sql.Identifier(self.index_name),
+            sql.Identifier(self.schema_name, self.table),
+            sql.Identifier(self.column),
+        )
+
+
+class ReplayResult(BaseModel):
+    sql: str
+    before_ms: float
+    after_ms: float
+
+    @property
+    def speedup(self) -> float:
+        return self.before_ms / max(self.after_ms, 1e-9)
+
+
+class BenchmarkReport(BaseModel):
+    """Median latency of each logged query before and after the proposed indexes"""
+
+    indexes: list[str]
+    applied: bool
+    results: list[ReplayResult]
+
+    @property
+    def total_before_ms(self) -> float:
+        return sum(r.before_ms for r in self.results)
+
+    @property
+    def total_after_ms(self) -> float:
+        return sum(r.after_ms for r in self.results)
+
+
+#################################
+# Workload analysis
+#################################
+
+
+def _dictionary_columns(data_dict: DataDictionary) -> dict[str, set[str]]:
+    """Map "schema.table" to its column names (lowercased)"""
+    return {
+        f"{schema.name}.{table.name}".lower(): {c.name.lower() for c in table.columns}
+        for database in data_dict.databases.values()
+        for schema in database.schemas.values()
+        for table in schema.tables.values()
+    }
+
+
+def _predicate_columns(
+    query: str, known_columns: dict[str, set[str]]
+) -> set[tuple[str, str, PredicateKind]]:
+    """Collect the (table, column, kind) an index could serve in `query`"""
+    found = set()
+    for select in parse_one(query, read="postgres").find_all(exp.Select):
+        from_ = _from_clause(select)
+        tables = [from_.this] if from_ else []
+        tables += [join.this for join in select.args.get("joins") or []]
+        aliases = {
+            t.alias_or_name.lower(): f"{t.db or 'public'}.{t.name}".lower()
+            for t in tables
+            if isinstance(t, exp.Table)
+        }
+
+        def resolve(column: exp.Expression) -> tuple[str, str] | None:
+            if not isinstance(column, exp.Column):
+                return None
+            name = column.name.lower()
+            if column.table:
+                candidates = [aliases.get(column.table.lower())]
+            else:
+                candidates = set(aliases.values())
+            matches = [t for t in candidates if name in known_columns.get(t, ())]
+            return (matches[0], name) if len(matches) == 1 else None
+
+        conditions = _conjuncts(select.args.get("where"))
+        for join in select.args.get("joins") or []:
+            conditions += _conjuncts(join.args.get("on"))
+
+        for condition in conditions:
+            if not isinstance(condition, _EQUALITY_PREDICATES + _RANGE_PREDICATES):
+                continue
+            left, right = resolve(condition.this), resolve(condition.expression)
+            if left and right and isinstance(condition, exp.EQ):
+                found.add((*left, "join"))
+                found.add((*right, "join"))
+                continue
+            kind = "range" if isinstance(condition, _RANGE_PREDICATES) else "equality"
+            for side in (left, right):
+                if side:
+                    found.add((*side, kind))
+
+    return found
+
+
+def _seq_scanned_tables(cursor, query: str) -> set[str]:
+    """Tables the current plan reads with a sequential scan (EXPLAIN only, no run)"""
+    cursor.execute(f"EXPLAIN (VERBOSE, FORMAT JSON) {query}")
+    scanned, stack = set(), [cursor.fetchone()[0][0]["Plan"]]
+    while stack:
+        node = stack.pop()
+        if node.get("Node Type") == "Seq Scan":
+            scanned.add(f"{node['Schema']}.{node['Relation Name']}".lower())
+        stack.extend(node.get("Plans", []))
+    return scanned
+
+
+def _indexed_leading_columns(cursor) -> set[tuple[str, str]]:
+    cursor.execute(
+        """
+        SELECT n.nspname || '.' || c.relname, a.attname
+        FROM pg_index i
+        JOIN pg_class c ON c.oid = i.indrelid
+        JOIN pg_namespace n ON n.oid = c.relnamespace
+        JOIN pg_attribute a ON a.attrelid = c.oid AND a.attnum = i.indkey[0]
+        """
+    )
+    return {(table.lower(), column.lower()) for table, column in cursor.fetchall()}
+
+
+def _table_rows(cursor) -> dict[str, int]:
+    cursor.execute(
+        """
+        SELECT n.nspname || '.' || c.relname, GREATEST(c.reltuples, 0)::bigint
+        FROM pg_class c
+        JOIN pg_namespace n ON n.oid = c.relnamespace
+        WHERE c.relkind IN ('r', 'p')
+        """
+    )
+    return {table.lower(): rows for table, rows in cursor.fetchall()}
+
+
+def advise_indexes(
+    cursor,
+    workload: list[WorkloadRecord],
+    data_dict: DataDictionary,
+    min_table_rows: int = 1000,
+) -> list[IndexCandidate]:
+    """Propose single-column indexes for the logged workload, best first.
+
+    The benefit of a candidate is estimated as the logged time of every query
+    whose current plan sequentially scans the column's table, weighted by the
+    predicate kind and by the table's share of the rows scanned by the query.
+    """
+    known_columns = _dictionary_columns(data_dict)
+    indexed = _indexed_leading_columns(cursor)
+    table_rows = _table_rows(cursor)
+
+    by_query: dict[str, list[WorkloadRecord]] = defaultdict(list)
+    for record in workload:
+        if record.error is None and record.served_from_rollup is None:
+            by_query[record.sql].append(record)
+
+    usage: dict[tuple[str, str], dict[str, int]] = defaultdict(lambda: defaultdict(int))
+    queries: dict[tuple[str, str], set[str]] = defaultdict(set)
+    workload_ms: dict[tuple[str, str], float] = defaultdict(float)
+    benefit: dict[tuple[str, str], float] = defaultdict(float)
+
+    for query, records in by_query.items():
+        try:
+            predicates = _predicate_columns(query, known_columns)
+            scanned = _seq_scanned_tables(cursor, query)
+        except Exception as e:
+            print(f"Skipping query the advisor cannot analyze ({e}): {query}")
+            cursor.connection.rollback()
+            continue
+
+        scanned_rows = sum(table_rows.get(t, 0) for t in scanned) or 1
+        logged_ms = sum(r.elapsed_ms for r in records)
+        for table, column, kind in predicates:
+            key = (table, column)
+            if key in indexed or table not in scanned:
+                continue
+            if table_rows.get(table, 0) < min_table_rows:
+                continue
+            share = table_rows[table] / scanned_rows
+            usage[key][kind] += len(records)
+            if query not in queries[key]:
+                queries[key].add(query)
+                workload_ms[key] += logged_ms
+            benefit[key] += logged_ms * share * _KIND_WEIGHTS[kind]
+
+    candidates = [
+        IndexCandidate(
+            schema_name=table.split(".", 1)[0],
+            table=table.split(".", 1)[1],
+            column=column,
+            usage=dict(usage[(table, column)]),
+            query_count=len(queries[(table, column)]),
+            workload_ms=workload_ms[(table, column)],
+            estimated_benefit_ms=benefit[(table, column)],
+            table_rows=table_rows[table],
+        )
+        for table, column in usage
+    ]
+    return sorted(candidates, key=lambda c: c.estimated_benefit_ms, reverse=True)
+
+
+#################################
+# Index creation and replay
+#################################
+
+
+def create_indexes(conn, candidates: list[IndexCandidate]):
+    """Create the indexes without blocking writes (CONCURRENTLY needs autocommit)"""
+    autocommit = conn.autocommit
+    conn.autocommit = True
+    try:
+        with conn.cursor() as cur:
+            for candidate in candidates:
+                print(f"Creating index {candidate.index_name}")
+                cur.execute(candidate.ddl(concurrently=True))
+                cur.execute(
+                    sql.SQL("ANALYZE {}").format(
+                        sql.Identifier(candidate.schema_name, candidate.table)
+                    )
+                )
+    finally:
+        conn.autocommit = autocommit
+
+
+def replay(cursor, queries: list[str], repeat: int = 5) -> dict[str, float]:
+    """Median latency (ms) of each query over `repeat` runs, after one warm-up run"""
+    latencies = {}
+    for query in queries:
+        cursor.execute(query)
+        cursor.fetchall()
+        runs = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            cursor.execute(query)
+            cursor.fetchall()
+            runs.append((time.perf_counter() - start) * 1000)
+        latencies[query] = statistics.median(runs)
+    return latencies
+
+
+def benchmark(
+    conn,
+    candidates: list[IndexCandidate],
+    queries: list[str],
+    repeat: int = 5,
+    apply: bool = False,
+) -> BenchmarkReport:
+    """Replay the workload before and after the candidate indexes.
+
+    Without `apply`, the indexes are built inside a transaction that is rolled
+    back after the replay, so nothing is left behind (writes to the indexed
+    tables are blocked while it runs).
+    """
+    with conn.cursor() as cur:
+        before = replay(cur, queries, repeat)
+    conn.rollback()
+
+    if apply:
+        create_indexes(conn, candidates)
+        with conn.cursor() as cur:
+            after = replay(cur, queries, repeat)
+        conn.rollback()
+    else:
+        try:
+            with conn.cursor() as cur:
+                for candidate in candidates:
+                    cur.execute(candidate.ddl())
+                    cur.execute(
+                        sql.SQL("ANALYZE {}").format(
+                            sql.Identifier(candidate.schema_name, candidate.table)
+                        )
+                    )
+                after = replay(cur, queries, repeat)
+        finally:
+            conn.rollback()
+
+    return BenchmarkReport(
+        indexes=[c.index_name for c in candidates],
+        applied=apply,
+        results=[
+            ReplayResult(sql=q, before_ms=before[q], after_ms=after[q]) for q in queries
+        ],
+    )
@@ -0,0 +1,318 @@
+import threading
+import time
+from collections.abc import Callable
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from functools import partial
+from pathlib import Path
+from typing import Any, Literal
+
+from pydantic import BaseModel, computed_field
+
+from ..utils.consts import MODELS_FILE
+from ..utils.utils import load_config
+
+LaunchKind = Literal["primary", "hedge", "fallback"]
+
+
+class ModelRouteError(Exception):
+    """No model of a route could answer (all failed or all circuits open)"""
+
+
+class ModelConfig(BaseModel):
+    """A chat model the routes can call, as passed to `init_chat_model`"""
+
+    model: str = ""
+    model_provider: str
+    kwargs: dict[str, Any] = {}  # e.g. temperature, timeout, max_retries
+    script: list[
+        dict[str, Any]
+    ] = []  # model_provider "fake" only, see ScriptedChatModel
+
+
+class RouteConfig(BaseModel):
+    """Models of one LLM call site, the primary first"""
+
+    models: list[str]
+    hedge_after_s: float | None = None  # None: no hedging, fallback on errors only
+    deadline_s: float = 60.0
+    model_kwargs: dict[str, Any] = {}  # passed to every model of the route
+
+
+class BreakerConfig(BaseModel):
+    failure_threshold: int = 3
+    reset_after_s: float = 30.0
+
+
+class RouteStats(BaseModel):
+    """Calls of a route and what hedging did for them"""
+
+    calls: int = 0
+    hedged: int = 0  # a second model was fired while the first was still running
+    hedge_wins: int = 0  # ... and answered first
+    fallbacks: int = 0  # the next model was fired after every running one failed
+    timeouts: int = 0
+    failures: int = 0
+    # How much earlier hedge wins answered than their primary (measured when the
+    # primary finishes; primaries still hanging are not counted)
+    latency_saved_ms: float = 0.0
+    wins: dict[str, int] = {}
+
+    @computed_field
+    @property
+    def hedge_rate(self) -> float:
+        return self.hedged / self.calls if self.calls else 0.0
+
+
+class CircuitBreaker:
+    """Stops calling a model after `failure_threshold` consecutive failures.
+
+    Once `reset_after_s` has passed, a single trial call is let through: its
+    success closes the breaker, its failure opens it again.
+    """
+
+    def __init__(
+        self,
+        failure_threshold: int = 3,
+        reset_after_s: float = 30.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.failure_threshold = failure_threshold
+        self.reset_after_s = reset_after_s
+        self._clock = clock
+        self._failures = 0
+        self._opened_at: float | None = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> Literal["closed", "open", "half_open"]:
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            if self._clock() - self._opened_at >= self.reset_after_s:
+                return "half_open"
+            return "open"
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if self._trial_in_flight:
+                return False
+            if self._clock() - self._opened_at >= self.reset_after_s:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._trial_in_flight = False
+            if self._opened_at is not None or self._failures >= self.failure_threshold:
+                self._opened_at = self._clock()
+
+
+@dataclass
+class _RoutedCall:
+    """Outcome of one `ModelRouter.invoke`, shared with the attempts' callbacks"""
+
+    primary: str
+    winner_kind: LaunchKind | None = None
+    won_at: float | None = None
+    timed_out: bool = False
+
+
+def _build_chat_model(config: ModelConfig, model_kwargs: dict):
+    if config.model_provider == "fake":
+        from .fake_chat_models import ScriptedChatModel
+
+        return ScriptedChatModel(script=config.script)
+
+    from langchain.chat_models import init_chat_model
+
+    kwargs = dict(config.kwargs)
+    if model_kwargs:
+        kwargs["model_kwargs"] = {**kwargs.get("model_kwargs", {}), **model_kwargs}
+    return init_chat_model(config.model, model_provider=config.model_provider, **kwargs)
+
+
+class ModelRouter:
+    """Calls the models of a route with a deadline, hedging and circuit breakers.
+
+    The route's primary model is called first. If it has not answered after
+    `hedge_after_s`, the next model is fired as well and the first answer wins;
+    a model that fails is replaced by the next one right away. Models whose
+    circuit breaker is open are skipped. Losing calls cannot be cancelled: they
+    run to completion in the background and only update the breakers and stats.
+    """
+
+    def __init__(
+        self,
+        models: dict[str, ModelConfig],
+        routes: dict[str, RouteConfig],
+        breaker: BreakerConfig | None = None,
+        model_factory: Callable[[ModelConfig, dict], Any] = _build_chat_model,
+        max_workers: int = 32,
+    ):
+        breaker = breaker or BreakerConfig()
+        for route_name, route in routes.items():
+            unknown = set(route.models) - set(models)
+            if not route.models or unknown:
+                raise ValueError(
+                    f"Route {route_name}: unknown models {sorted(unknown)}"
+                )
+
+        self.routes = routes
+        self.breakers = {
+            name: CircuitBreaker(breaker.failure_threshold, breaker.reset_after_s)
+            for name in models
+        }
+        self._chat_models = {
+            (route_name, name): model_factory(models[name], route.model_kwargs)
+            for route_name, route in routes.items()
+            for name in route.models
+        }
+        self._stats = {route_name: RouteStats() for route_name in routes}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers, thread_name_prefix="llm")
+
+    @classmethod
+    def from_config(
+        cls, models_file: str | Path = MODELS_FILE, **kwargs
+    ) -> "ModelRouter":
+        config = load_config(models_file)
+        return cls(
+            models={
+                name: ModelConfig(**model) for name, model in config["models"].items()
+            },
+            routes={
+                name: RouteConfig(**route) for name, route in config["routes"].items()
+            },
+            breaker=BreakerConfig(**config.get("circuit_breaker", {})),
+            **kwargs,
+        )
+
+    def _settle(self, route_name: str, model: str, call: _RoutedCall, future: Future):
+        """Done callback of every attempt, winning or not"""
+        if call.timed_out or future.cancelled():
+            return  # already counted as a failure when the deadline passed
+        if future.exception() is None:
+            self.breakers[model].record_success()
+        else:
+            self.breakers[model].record_failure()
+
+        if model == call.primary and call.winner_kind == "hedge":
+            with self._lock:
+                self._stats[route_name].latency_saved_ms += (
+                    time.monotonic() - call.won_at
+                ) * 1000
+
+    def invoke(self, route_name: str, input: Any) -> Any:
+        """Answer of the first model of the route to respond within its deadline"""
+        route = self.routes[route_name]
+        stats = self._stats[route_name]
+        started = time.monotonic()
+        deadline = started + route.deadline_s
+        remaining = list(route.models)
+        in_flight: dict[Future, tuple[str, LaunchKind]] = {}
+        call = _RoutedCall(primary=route.models[0])
+        errors = []
+
+        def launch(kind: LaunchKind) -> bool:
+            while remaining:
+                model = remaining.pop(0)
+                if not self.breakers[model].allow():
+                    continue
+                future = self._executor.submit(
+                    self._chat_models[(route_name, model)].invoke, input
+                )
+                in_flight[future] = (model, kind)
+                future.add_done_callback(partial(self._settle, route_name, model, call))
+                with self._lock:
+                    if kind == "hedge":
+                        stats.hedged += 1
+                    elif kind == "fallback":
+                        stats.fallbacks += 1
+                return True
+            return False
+
+        with self._lock:
+            stats.calls += 1
+        if not launch("primary"):
+            with self._lock:
+                stats.failures += 1
+            raise ModelRouteError(f"Route {route_name}: every model's circuit is open")
+
+        def next_hedge() -> float:
+            if route.hedge_after_s is None or not remaining:
+                return float("inf")
+            return time.monotonic() + route.hedge_after_s
+
+        hedge_at = next_hedge()
+        while in_flight:
+            timeout = min(deadline, hedge_at) - time.monotonic()
+            done, _ = wait(
+                in_flight, timeout=max(timeout, 0), return_when=FIRST_COMPLETED
+            )
+            for future in done:
+                model, kind = in_flight.pop(future)
+                if future.exception() is not None:
+                    errors.append(f"{model}: {future.exception()}")
+                    continue
+                call.winner_kind, call.won_at = kind, time.monotonic()
+                with self._lock:
+                    stats.wins[model] = stats.wins.get(model, 0) + 1
+                    if kind == "hedge":
+                        stats.hedge_wins += 1
+                return future.result()
+
+            if time.monotonic() >= deadline:
+                break
+            if not in_flight:
+                launch("fallback")
+                hedge_at = next_hedge()
+            elif time.monotonic() >= hedge_at:
+                launch("hedge")
+                hedge_at = next_hedge()
+
+        if in_flight:
+            call.timed_out = True
+            for model, _ in in_flight.values():
+                self.breakers[model].record_failure()
+            with self._lock:
+                stats.timeouts += 1
+            raise TimeoutError(
+                f"Route {route_name}: no answer within {route.deadline_s}s"
+            )
+
+        with self._lock:
+            stats.failures += 1
+        raise ModelRouteError(f"Route {route_name}: every model failed ({errors})")
+
+    def runnable(self, route_name: str):
+        """The route as a step of a langchain chain (`prompt | ... | parser`)"""
+        from langchain_core.runnables import RunnableLambda
+
+        return RunnableLambda(partial(self.invoke, route_name), name=route_name)
+
+    def stats(self) -> dict[str, RouteStats]:
+        with self._lock:
+            return {
+                route_name: stats.model_copy(deep=True)
+                for route_name, stats in self._stats.items()
+            }
+
+    def shutdown(self, wait: bool = False):
+        """Stop the workers (`wait` lets the losing calls still running settle)"""
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+
+
+def init_model_router() -> ModelRouter:
+    return ModelRouter.from_config(MODELS_FILE)
@@ -0,0 +1,616 @@
+import threading
+import time
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Annotated, Literal
+
+import psycopg2
+from psycopg2 import sql
+from pydantic import BaseModel, Field
+from sqlglot import exp, parse_one
+
+from ..utils.consts import ROLLUPS_FILE
+from ..utils.utils import _conjuncts, _from_clause, load_config
+from .engines import EngineRegistry
+
+# Measures that can be rolled up further when the query groups by fewer dimensions
+# than the rollup (COUNT re-aggregates as a SUM of the partial counts).
+_REAGGREGATABLE = {
+    exp.Sum: exp.Sum,
+    exp.Count: exp.Sum,
+    exp.Min: exp.Min,
+    exp.Max: exp.Max,
+}
+_ROLLUP_ALIAS = "rlp"
+
+
+class _NoMatch(Exception):
+    """Raised internally when a query cannot be answered by a rollup"""
+
+
+class RollupDefinition(BaseModel):
+    """A materialized view definition loaded from the rollups config"""
+
+    name: str
+    schema_name: Annotated[str, Field(alias="schema")]
+    query: str
+    refresh: Literal["incremental", "full"] = "incremental"
+    refresh_interval: int | None = None  # seconds, None = manual refresh only
+
+    @property
+    def qualified_name(self) -> str:
+        return f"{self.schema_name}.{self.name}"
+
+
+class RollupUsage(BaseModel):
+    """One generated query that was served from a rollup"""
+
+    served_at: datetime
+    rollup: str
+    original_sql: str
+    rewritten_sql: str
+    elapsed_ms: float
+    estimated_speedup: float | None  # planner cost of original / rewritten query
+
+
+@dataclass
+class _QueryShape:
+    """Normalized pieces of an aggregate SELECT, keyed by canonical SQL"""
+
+    tables: frozenset[str]
+    aliases: dict[str, str]
+    joins: frozenset[frozenset[str]]
+    filters: dict[str, exp.Expression]
+    group: list[str]
+    select: exp.Select
+    dimensions: dict[str, str] = field(default_factory=dict)  # canonical -> column
+    # canonical -> (column, aggregate to roll it up further, None if it cannot be)
+    measures: dict[str, tuple[str, type | None]] = field(default_factory=dict)
+
+
+#################################
+# SQL shape analysis
+#################################
+
+
+def _table_key(table: exp.Table) -> str:
+    return f"{table.db}.{table.name}".lower()
+
+
+def _canonical(node: exp.Expression, aliases: dict[str, str]) -> str:
+    """Render `node` with every column fully qualified by its real table"""
+
+    def qualify(n: exp.Expression) -> exp.Expression:
+        if not isinstance(n, exp.Column):
+            return n
+        table = n.table.lower()
+        if table:
+            if table not in aliases:
+                raise _NoMatch(f"unknown table reference {table}")
+            real = aliases[table]
+        elif len(set(aliases.values())) == 1:
+            real = next(iter(aliases.values()))
+        else:
+            raise _NoMatch(f"ambiguous column {n.name}")
+        schema_name, table_name = real.split(".", 1)
+        return exp.column(n.name.lower(), table=table_name, db=schema_name)
+
+    node = node.unalias() if isinstance(node, exp.Alias) else node
+    return node.transform(qualify).sql(dialect="postgres")
+
+
+def _resolve_group_item(item: exp.Expression, select: exp.Select) -> exp.Expression:
+    """Map `GROUP BY 1` and `GROUP BY <alias>` back to the projected expression"""
+    if isinstance(item, exp.Literal) and not item.is_string:
+        return select.expressions[int(item.this) - 1].unalias()
+    if isinstance(item, exp.Column) and not item.table:
+        for projection in select.expressions:
+            if isinstance(projection, exp.Alias) and projection.alias == item.name:
+                return projection.this
+    return item
+
+
+def _analyze(select: exp.Expression) -> _QueryShape:
+    if not isinstance(select, exp.Select):
+        raise _NoMatch("not a plain SELECT")
+    if select.args.get("with") or select.args.get("distinct"):
+        raise _NoMatch("CTEs and DISTINCT are not rewritten")
+    if select.find(exp.Subquery, exp.Window):
+        raise _NoMatch("subqueries and window functions are not rewritten")
+
+    from_ = _from_clause(select)
+    if from_ is None or not isinstance(from_.this, exp.Table):
+        raise _NoMatch("FROM must reference a table")
+
+    aliases: dict[str, str] = {}
+    tables = [from_.this] + [join.this for join in select.args.get("joins") or []]
+    for table in tables:
+        if not isinstance(table, exp.Table):
+            raise _NoMatch("joins must reference tables")
+        aliases[table.alias_or_name.lower()] = _table_key(table)
+    if len(set(aliases.values())) != len(tables):
+        raise _NoMatch("self joins are not rewritten")
+
+    joins = set()
+    for join in select.args.get("joins") or []:
+        if join.side or join.kind not in ("", "INNER") or join.args.get("using"):
+            raise _NoMatch("only inner joins with ON conditions are rewritten")
+        for condition in _conjuncts(join.args.get("on")):
+            if not (
+                isinstance(condition, exp.EQ)
+                and isinstance(condition.left, exp.Column)
+                and isinstance(condition.right, exp.Column)
+            ):
+                raise _NoMatch("join conditions must be column equalities")
+            joins.add(
+                frozenset(
+                    (
+                        _canonical(condition.left, aliases),
+                        _canonical(condition.right, aliases),
+                    )
+                )
+            )
+
+    group = select.args.get("group")
+    group_items = [
+        _canonical(_resolve_group_item(item, select), aliases)
+        for item in (group.expressions if group else [])
+    ]
+
+    return _QueryShape(
+        tables=frozenset(aliases.values()),
+        aliases=aliases,
+        joins=frozenset(joins),
+        filters={
+            _canonical(c, aliases): c for c in _conjuncts(select.args.get("where"))
+        },
+        group=group_items,
+        select=select,
+    )
+
+
+#################################
+# Rollups
+#################################
+
+
+class Rollup:
+    """A rollup definition together with its analyzed shape"""
+
+    def __init__(self, definition: RollupDefinition):
+        self.definition = definition
+        try:
+            self.shape = _analyze(parse_one(definition.query, read="postgres"))
+        except _NoMatch as e:
+            raise ValueError(f"Rollup {definition.name}: unsupported query ({e})")
+
+        for projection in self.shape.select.expressions:
+            if not isinstance(projection, exp.Alias):
+                raise ValueError(
+                    f"Rollup {definition.name}: every projection must be aliased"
+                )
+            key = _canonical(projection, self.shape.aliases)
+            if key in self.shape.group:
+                self.shape.dimensions[key] = projection.alias
+            elif isinstance(projection.this, exp.AggFunc):
+                reaggregate = (
+                    None
+                    if projection.this.find(exp.Distinct)
+                    else _REAGGREGATABLE.get(type(projection.this))
+                )
+                self.shape.measures[key] = (projection.alias, reaggregate)
+            else:
+                raise ValueError(
+                    f"Rollup {definition.name}: {projection.alias} is neither "
+                    "a GROUP BY expression nor an aggregate"
+                )
+        if set(self.shape.group) != set(self.shape.dimensions):
+            raise ValueError(
+                f"Rollup {definition.name}: every GROUP BY expression must be projected"
+            )
+
+    @property
+    def name(self) -> str:
+        return self.definition.name
+
+    def rewrite(self, query: _QueryShape) -> exp.Select:
+        """Rewrite an analyzed query to read from this rollup, or raise _NoMatch"""
+        shape = self.shape
+        if query.tables != shape.tables or query.joins != shape.joins:
+            raise _NoMatch("different tables or join graph")
+        if not set(shape.filters) <= set(query.filters):
+            raise _NoMatch("query lacks the rollup's filters")
+        if not set(query.group) <= set(shape.dimensions):
+            raise _NoMatch("query groups by a non-dimension")
+        reaggregate = set(query.group) != set(shape.dimensions)
+
+        def substitute(node: exp.Expression) -> exp.Expression:
+            if isinstance(node, exp.Alias):
+                return node
+            if isinstance(node, exp.AggFunc):
+                # Any other aggregate, COUNT(*) included, would run over rollup rows
+                if _canonical(node, query.aliases) not in shape.measures:
+                    raise _NoMatch(f"{node.sql()} is not a rollup measure")
+            elif not node.find(exp.Column):
+                return node
+            try:
+                key = _canonical(node, query.aliases)
+            except _NoMatch:
+                return node  # e.g. an output alias in ORDER BY
+            if key in shape.dimensions:
+                return exp.column(shape.dimensions[key], table=_ROLLUP_ALIAS)
+            if key in shape.measures:
+                column, aggregate = shape.measures[key]
+                rollup_column = exp.column(column, table=_ROLLUP_ALIAS)
+                if not reaggregate:
+                    return rollup_column
+                if aggregate is None:
+                    raise _NoMatch(f"{column} cannot be re-aggregated")
+                rolled = aggregate(this=rollup_column)
+                if isinstance(node, exp.Count):
+                    # SUM of the partial counts is NULL over no rows and numeric
+                    rolled = exp.cast(
+                        exp.Coalesce(this=rolled, expressions=[exp.Literal.number(0)]),
+                        exp.DataType.Type.BIGINT,
+                    )
+                return rolled
+            return node
+
+        def rewrite_node(node: exp.Expression, aliases=frozenset()) -> exp.Expression:
+            rewritten = node.transform(substitute)
+            for column in rewritten.find_all(exp.Column):
+                if column.table == _ROLLUP_ALIAS:
+                    continue
+                if column.table or column.name not in aliases:
+                    raise _NoMatch(f"{column.sql()} is not in the rollup")
+            return rewritten
+
+        select = query.select
+        output_names = {p.alias for p in select.expressions if p.alias}
+
+        projections = []
+        for projection in select.expressions:
+            rewritten = rewrite_node(projection)
+            if projection.output_name and not rewritten.alias:
+                if rewritten.output_name != projection.output_name:
+                    rewritten = exp.alias_(rewritten, projection.output_name)
+            projections.append(rewritten)
+
+        rollup_table = exp.to_table(self.definition.qualified_name).as_(_ROLLUP_ALIAS)
+        rewritten = exp.select(*projections).from_(rollup_table)
+
+        conditions = [
+            rewrite_node(condition)
+            for key, condition in query.filters.items()
+            if key not in shape.filters
+        ]
+        having = select.args.get("having")
+        if having is not None and not reaggregate:
+            # One row per group already: HAVING becomes a plain filter
+            conditions.append(rewrite_node(having.this))
+            having = None
+        if conditions:
+            rewritten = rewritten.where(*conditions)
+        if reaggregate:
+            if query.group:
+                rewritten = rewritten.group_by(
+                    *(
+                        exp.column(shape.dimensions[key], table=_ROLLUP_ALIAS)
+                        for key in query.group
+                    )
+                )
+            if having is not None:
+                rewritten = rewritten.having(rewrite_node(having.this))
+
+        if select.args.get("order"):
+            # ORDER BY may name an output column, which is left as is
+            rewritten.set("order", rewrite_node(select.args["order"], output_names))
+        for modifier in ("limit", "offset"):
+            if select.args.get(modifier):
+                rewritten.set(modifier, select.args[modifier].copy())
+
+        return rewritten
+
+
+class RollupRegistry:
+    """Holds the configured rollups, rewrites queries onto them and refreshes them"""
+
+    def __init__(
+        self,
+        definitions: list[RollupDefinition],
+        engines: EngineRegistry,
+        max_usage_records=1000,
+    ):
+        self.engines = engines
+        self.rollups = [Rollup(d) for d in definitions]
+        self.databases: dict[str, list[Rollup]] = {}
+        for rollup in self.rollups:
+            database = engines.database_for_tables(set(rollup.shape.tables))
+            self.databases.setdefault(database, []).append(rollup)
+        self.active: set[str] = set()
+        self.usage: deque[RollupUsage] = deque(maxlen=max_usage_records)
+        # Planner speedup per (rollup, rewritten SQL): EXPLAINing the original heavy
+        # query on every hit would slow down the queries the rollup speeds up
+        self._speedups: OrderedDict[tuple[str, str], float] = OrderedDict()
+        self._max_speedups = max_usage_records
+        self._speedups_lock = threading.Lock()  # _lock is held during refreshes
+        self._write_counters: dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._scheduler: threading.Thread | None = None
+
+    @classmethod
+    def from_config(
+        cls, engines: EngineRegistry, config_path: Path | str = ROLLUPS_FILE
+    ) -> "RollupRegistry":
+        config = load_config(config_path) or {}
+        return cls(
+            [RollupDefinition(**rollup) for rollup in config.get("rollups") or []],
+            engines,
+        )
+
+    # Query rewrite
+
+    def rewrite(
+        self, query: str, database: str | None = None
+    ) -> tuple[str, Rollup] | None:
+        """Return the query rewritten onto the smallest matching active rollup"""
+        try:
+            shape = _analyze(parse_one(query, read="postgres"))
+        except Exception:
+            return None
+        if not shape.group and not shape.select.find(exp.AggFunc):
+            return None
+
+        rollups = self.databases.get(database, []) if database else self.rollups
+        candidates = sorted(
+            (r for r in rollups if r.name in self.active),
+            key=lambda r: len(r.shape.dimensions),
+        )
+        for rollup in candidates:
+            try:
+                return rollup.rewrite(shape).sql(dialect="postgres"), rollup
+            except _NoMatch:
+                continue
+        return None
+
+    def try_execute(
+        self, cursor, query: str, database: str | None = None
+    ) -> tuple[list, str] | None:
+        """Run `query` from a rollup if one matches, returning (rows, rollup name)
+
+        Returns None when no rollup applies or the rollup query failed, in which
+        case the caller runs the original query.
+        """
+        rewrite = self.rewrite(query, database)
+        if rewrite is None:
+            return None
+
+        rewritten_sql, rollup = rewrite
+        # A savepoint keeps the caller's transaction settings (e.g. statement_timeout)
+        cursor.execute("SAVEPOINT rollup_attempt")
+        try:
+            start = time.perf_counter()
+            cursor.execute(rewritten_sql)
+            rows = cursor.fetchall()
+            elapsed_ms = (time.perf_counter() - start) * 1000
+        except psycopg2.DatabaseError as e:
+            print(f"Rollup {rollup.name} failed, falling back to the original: {e}")
+            cursor.execute("ROLLBACK TO SAVEPOINT rollup_attempt")
+            return None
+
+        print(f"Served from rollup {rollup.name}: {rewritten_sql}")
+        self.record_usage(cursor, query, rewritten_sql, rollup, elapsed_ms)
+        return rows, rollup.name
+
+    def _estimate_speedup(self, cursor, original_sql, rewritten_sql, rollup):
+        """Planner cost ratio, computed on the first hit of a rewrite only"""
+        # The rewrite is rendered by sqlglot: same key for any formatting of the query
+        key = (rollup.name, rewritten_sql)
+        with self._speedups_lock:
+            if key in self._speedups:
+                self._speedups.move_to_end(key)
+                return self._speedups[key]
+
+        try:
+            speedup = _plan_cost(cursor, original_sql) / max(
+                _plan_cost(cursor, rewritten_sql), 1e-9
+            )
+        except psycopg2.Error as e:
+            print(f"Could not estimate rollup speedup: {e}")
+            cursor.execute("ROLLBACK TO SAVEPOINT rollup_attempt")
+            return None  # not cached: the next hit tries again
+
+        with self._speedups_lock:
+            self._speedups[key] = speedup
+            if len(self._speedups) > self._max_speedups:
+                self._speedups.popitem(last=False)
+        return speedup
+
+    def record_usage(self, cursor, original_sql, rewritten_sql, rollup, elapsed_ms):
+        """Log a rollup hit with the planner's estimate of the work it saved"""
+        speedup = self._estimate_speedup(cursor, original_sql, rewritten_sql, rollup)
+
+        self.usage.append(
+            RollupUsage(
+                served_at=datetime.now(timezone.utc),
+                rollup=rollup.name,
+                original_sql=original_sql,
+                rewritten_sql=rewritten_sql,
+                elapsed_ms=elapsed_ms,
+                estimated_speedup=speedup,
+            )
+        )
+
+    def usage_summary(self) -> dict:
+        per_rollup: dict[str, dict] = {}
+        for record in self.usage:
+            stats = per_rollup.setdefault(
+                record.rollup, {"hits": 0, "total_ms": 0.0, "speedups": []}
+            )
+            stats["hits"] += 1
+            stats["total_ms"] += record.elapsed_ms
+            if record.estimated_speedup is not None:
+                stats["speedups"].append(record.estimated_speedup)
+
+        return {
+            name: {
+                "hits": stats["hits"],
+                "avg_elapsed_ms": stats["total_ms"] / stats["hits"],
+                "avg_estimated_speedup": (
+                    sum(stats["speedups"]) / len(stats["speedups"])
+                    if stats["speedups"]
+                    else None
+                ),
+            }
+            for name, stats in per_rollup.items()
+        }
+
+    # Materialization
+
+    def sync_active(self, conn, database: str) -> set[str]:
+        """Only rollups that exist in their database are used for rewrites"""
+        with conn.cursor() as cur:
+            cur.execute("SELECT schemaname || '.' || matviewname FROM pg_matviews")
+            existing = {row[0] for row in cur.fetchall()}
+        conn.rollback()
+
+        rollups = self.databases.get(database, [])
+        self.active = (self.active - {r.name for r in rollups}) | {
+            r.name for r in rollups if r.definition.qualified_name in existing
+        }
+        return self.active
+
+    def create_all(self, conn, database: str):
+        """Create the materialized views (and the unique index CONCURRENTLY needs)"""
+        with conn.cursor() as cur:
+            for rollup in self.databases.get(database, []):
+                view = sql.Identifier(rollup.definition.schema_name, rollup.name)
+                print(f"Creating rollup {rollup.definition.qualified_name}")
+                cur.execute(
+                    sql.SQL("CREATE MATERIALIZED VIEW IF NOT EXISTS {} AS {}").format(
+                        view, sql.SQL(rollup.definition.query)
+                    )
+                )
+                dimensions = list(rollup.shape.dimensions.values())
+                if dimensions:
+                    cur.execute(
+                        sql.SQL(
+                            "CREATE UNIQUE INDEX IF NOT EXISTS {} ON {} ({})"
+                        ).format(
+                            sql.Identifier(f"{rollup.name}_dims_uidx"),
+                            view,
+                            sql.SQL(", ").join(map(sql.Identifier, dimensions)),
+                        )
+                    )
+        conn.commit()
+        self.sync_active(conn, database)
+
+    def refresh(self, conn, rollup: Rollup, force=False) -> bool:
+        """Refresh one rollup; incremental rollups are skipped when sources are unchanged"""
+        incremental = rollup.definition.refresh == "incremental"
+        with conn.cursor() as cur:
+            writes = _source_write_counter(cur, rollup.shape.tables)
+            if (
+                incremental
+                and not force
+                and self._write_counters.get(rollup.name) == writes
+            ):
+                return False
+
+            # CONCURRENTLY keeps the view readable and only writes the changed rows
+            concurrently = incremental and bool(rollup.shape.dimensions)
+            cur.execute(
+                sql.SQL("REFRESH MATERIALIZED VIEW {}{}").format(
+                    sql.SQL("CONCURRENTLY " if concurrently else ""),
+                    sql.Identifier(rollup.definition.schema_name, rollup.name),
+                )
+            )
+        conn.commit()
+        self._write_counters[rollup.name] = writes
+        return True
+
+    def refresh_all(self, force=False, rollups: list[Rollup] | None = None):
+        """Refresh the active rollups, one pooled primary connection per database"""
+        names = {r.name for r in rollups or self.rollups}
+        with self._lock:
+            for database, db_rollups in self.databases.items():
+                due = [r for r in db_rollups if r.name in names]
+                if not due:
+                    continue
+                conn = self.engines.raw_connection(database)
+                try:
+                    self.sync_active(conn, database)
+                    for rollup in due:
+                        if rollup.name in self.active:
+                            self.refresh(conn, rollup, force=force)
+                finally:
+                    conn.close()
+
+    def start_scheduler(self, tick: float = 30.0):
+        """Refresh each rollup every `refresh_interval` seconds in a daemon thread"""
+        scheduled = [r for r in self.rollups if r.definition.refresh_interval]
+        if not scheduled or self._scheduler is not None:
+            return
+
+        def run():
+            next_run = {r.name: 0.0 for r in scheduled}
+            while not self._stop.wait(tick):
+                due = [r for r in scheduled if time.monotonic() >= next_run[r.name]]
+                if not due:
+                    continue
+                try:
+                    self.refresh_all(rollups=due)
+                except Exception as e:
+                    print(f"Rollup refresh failed: {e}")
+                for rollup in due:
+                    next_run[rollup.name] = (
+                        time.monotonic() + rollup.definition.refresh_interval
+                    )
+
+        self._stop.clear()
+        self._scheduler = threading.Thread(
+            target=run, name="rollup-refresh", daemon=True
+        )
+        self._scheduler.start()
+
+    def stop_scheduler(self):
+        self._stop.set()
+        if self._scheduler is not None:
+            self._scheduler.join(timeout=5)
+            self._scheduler = None
+
+
+def _plan_cost(cursor, query: str) -> float:
+    cursor.execute(f"EXPLAIN (FORMAT JSON) {query}")
+    return float(cursor.fetchone()[0][0]["Plan"]["Total Cost"])
+
+
+def _source_write_counter(cursor, tables: frozenset[str]) -> int:
+    """Cheap change marker: cumulative row writes on the rollup's source tables"""
+    cursor.execute(
+        """
+        SELECT COALESCE(SUM(n_tup_ins + n_tup_upd + n_tup_del), 0)
+        FROM pg_stat_user_tables
+        WHERE schemaname || '.' || relname = ANY(%s)
+        """,
+        (list(tables),),
+    )
+    return int(cursor.fetchone()[0])
+
+
+def init_rollup_registry(engines: EngineRegistry) -> RollupRegistry:
+    registry = RollupRegistry.from_config(engines, ROLLUPS_FILE)
+    for database in registry.databases:
+        try:
+            conn = engines.raw_connection(database)
+            try:
+                registry.sync_active(conn, database)
+            finally:
+                conn.close()
+        except Exception as e:
+            print(f"Cannot check which rollups exist in {database}: {e}")
+
+    return registry
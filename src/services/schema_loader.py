@@ -1,3 +1,6 @@
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from functools import cached_property
 from pathlib import Path
 from typing import Annotated, Any
 
@@ -10,8 +13,32 @@ import sqlalchemy as sa
 from pydantic import BaseModel, BeforeValidator, Field
 from sqlalchemy.engine.reflection import Inspector
 
-from ..utils.consts import DB_CONNECTION_STRING, OUTPUT_SCHEMA_DIR, TABLES_FILE
+from ..utils.consts import OUTPUT_SCHEMA_DIR, TABLES_FILE, VALUE_HINTS_MAX_DISTINCT
 from ..utils.utils import load_config
+from .engines import EngineRegistry, init_engine_registry
+
+
+class ColumnStats(BaseModel):
+    """Planner statistics of a column, read from `pg_stats` (no table scan)"""
+
+    n_distinct: float  # estimated number of distinct values
+    null_frac: float
+    most_common_vals: list[str] | None = None  # only kept for low-cardinality columns
+
+    def format_hint(self, quote: bool) -> str:
+        hint = ""
+        if self.most_common_vals:
+            values = [
+                "'" + v.replace("'", "''") + "'" if quote else v
+                for v in self.most_common_vals
+            ]
+            if self.n_distinct > len(values):
+                values.append("...")
+            hint += f"VALUES ({', '.join(values)}), "
+        if self.null_frac >= 0.01:
+            hint += f"NULLS ({self.null_frac:.0%}), "
+
+        return hint
 
 
 class ColumnInfo(BaseModel):
@@ -20,15 +47,62 @@ class ColumnInfo(BaseModel):
     nullable: bool
     comment: str | None
     is_primary_key: bool
+    stats: ColumnStats | None = None
 
     def __str__(self):
         s = f"{self.name} ({self.type_.upper()}), NULLABLE ({self.nullable}), "
         if self.comment:
-            s += "DESCRIPTION ({self.comment})"
+            s += f"DESCRIPTION ({self.comment}), "
+        if self.stats and not self.is_primary_key:
+            is_text = any(t in self.type_.upper() for t in ("CHAR", "TEXT", "ENUM"))
+            s += self.stats.format_hint(quote=is_text)
 
         return s
 
 
+def fetch_column_stats(
+    inspector: Inspector, schema_name: str, table_name: str | None = None
+) -> dict[str, dict[str, ColumnStats]]:
+    """`pg_stats` of a schema (or one table) as {table: {column: stats}}.
+
+    Only catalog views are read. Most common values are kept for columns with at
+    most VALUE_HINTS_MAX_DISTINCT distinct values, so the LLM sees real literals
+    (e.g. order statuses) instead of guessing them.
+    """
+    query = sa.text(
+        """
+        SELECT s.tablename, s.attname, s.null_frac,
+               -- negative n_distinct is a fraction of the row count
+               CASE WHEN s.n_distinct < 0 THEN -s.n_distinct * GREATEST(c.reltuples, 0)
+                    ELSE s.n_distinct END,
+               s.most_common_vals::text::text[]
+        FROM pg_stats s
+        JOIN pg_namespace n ON n.nspname = s.schemaname
+        JOIN pg_class c ON c.relnamespace = n.oid AND c.relname = s.tablename
+        WHERE s.schemaname = :schema
+          AND (CAST(:table AS text) IS NULL OR s.tablename = :table)
+        """
+    )
+    bind = inspector.bind
+    stats: dict[str, dict[str, ColumnStats]] = {}
+    try:
+        with (
+            bind.connect() if isinstance(bind, sa.Engine) else nullcontext(bind) as conn
+        ):
+            rows = conn.execute(query, {"schema": schema_name, "table": table_name})
+            for table, column, null_frac, n_distinct, values in rows:
+                low_cardinality = 0 < n_distinct <= VALUE_HINTS_MAX_DISTINCT
+                stats.setdefault(table, {})[column] = ColumnStats(
+                    n_distinct=n_distinct,
+                    null_frac=null_frac,
+                    most_common_vals=values if low_cardinality else None,
+                )
+    except sa.exc.SQLAlchemyError as e:
+        print(f"Cannot read column statistics of {schema_name}: {e}")
+
+    return stats
+
+
 class TableInfo(BaseModel):
     """Class that contains informations about a table"""
 
@@ -41,9 +115,17 @@ class TableInfo(BaseModel):
 
     @classmethod
     def from_inspector(
-        cls, inspector: Inspector, table_name: str, schema_name: str
+        cls,
+        inspector: Inspector,
+        table_name: str,
+        schema_name: str,
+        column_stats: dict[str, ColumnStats] | None = None,
     ) -> "TableInfo":
         """Use's SQLAlchemy's Inspector to reflect the table"""
+        if column_stats is None:
+            column_stats = fetch_column_stats(inspector, schema_name, table_name).get(
+                table_name, {}
+            )
 
         columns = inspector.get_columns(table_name, schema_name)
         primary_keys = inspector.get_pk_constraint(table_name, schema_name)[
@@ -52,7 +134,12 @@ class TableInfo(BaseModel):
         foreign_keys = inspector.get_foreign_keys(table_name, schema_name)
         description = inspector.get_table_comment(table_name, schema_name).get("text")
         columns_info = [
-            ColumnInfo(**c, is_primary_key=(c["name"] in primary_keys)) for c in columns
+            ColumnInfo(
+                **c,
+                is_primary_key=(c["name"] in primary_keys),
+                stats=column_stats.get(c["name"]),
+            )
+            for c in columns
         ]
 
         return cls(
@@ -65,10 +152,13 @@ class TableInfo(BaseModel):
         )
 
     def format_context(self) -> str:
-        context = f"\t\t<TABLE ({self.name}) COLUMNS:>\n".expandtabs(4)
-        for c in self.columns:
-            context += f"\t\t\t-  {c!s} \n".expandtabs(4)
+        return self.rendered_context
 
+    @cached_property
+    def rendered_context(self) -> str:
+        # Rendered once per instance: schema refreshes swap in new TableInfo objects
+        context = f"\t\t<TABLE ({self.name}) COLUMNS:>\n".expandtabs(4)
+        context += "".join(f"\t\t\t-  {c!s} \n".expandtabs(4) for c in self.columns)
         context += f"\t\t</TABLE ({self.name}) COLUMNS:>\n".expandtabs(4)
         return context
 
@@ -81,18 +171,25 @@ class SchemaInfo(BaseModel):
 
     @classmethod
     def from_inspector(cls, inspector: Inspector, schema_name: str) -> "SchemaInfo":
+        # One pg_stats query for the whole schema rather than one per table
+        stats = fetch_column_stats(inspector, schema_name)
         return cls(
             name=schema_name,
             tables={
-                table_name: TableInfo.from_inspector(inspector, table_name, schema_name)
+                table_name: TableInfo.from_inspector(
+                    inspector, table_name, schema_name, stats.get(table_name, {})
+                )
                 for table_name in inspector.get_table_names(schema_name)
             },
         )
 
     def format_context(self) -> str:
+        return self.rendered_context
+
+    @cached_property
+    def rendered_context(self) -> str:
         context = f"\t<SCHEMA: {self.name}>\n".expandtabs(4)
-        for table in self.tables.values():
-            context += table.format_context() + "\n"
+        context += "".join(t.format_context() + "\n" for t in self.tables.values())
         context += f"\t</SCHEMA: {self.name}>".expandtabs(4)
 
         return context
@@ -105,9 +202,12 @@ class DatabaseInfo(BaseModel):
     schemas: dict[str, SchemaInfo]
 
     def format_context(self) -> str:
+        return self.rendered_context
+
+    @cached_property
+    def rendered_context(self) -> str:
         context = f"<DATABASE: {self.name}>\n"
-        for schema in self.schemas.values():
-            context += schema.format_context() + "\n"
+        context += "".join(s.format_context() + "\n" for s in self.schemas.values())
         context += f"</DATABASE: {self.name}>\n\n"
 
         return context
@@ -135,6 +235,40 @@ class DataDictionary(BaseModel):
 
         return cls(databases=databases)
 
+    @classmethod
+    def from_engines(
+        cls,
+        engines: EngineRegistry,
+        database_schema_dict: dict,
+        max_workers: int = 8,
+    ) -> "DataDictionary":
+        """Reflect every (database, schema) pair concurrently, each on its own database"""
+
+        def reflect(db_name: str, schema_name: str) -> SchemaInfo:
+            # Inspectors cache per instance and are not thread-safe: one per task
+            inspector = sa.inspect(engines.databases[db_name].primary)
+            return SchemaInfo.from_inspector(inspector, schema_name)
+
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            futures = {
+                (db_name, schema_name): pool.submit(reflect, db_name, schema_name)
+                for db_name, schemas in database_schema_dict.items()
+                for schema_name in schemas
+            }
+
+        return cls(
+            databases={
+                db_name: DatabaseInfo(
+                    name=db_name,
+                    schemas={
+                        schema_name: futures[(db_name, schema_name)].result()
+                        for schema_name in schemas
+                    },
+                )
+                for db_name, schemas in database_schema_dict.items()
+            }
+        )
+
     def save(self, output_path: Path | str) -> Path | str:
         if isinstance(output_path, str):
             output_path = Path(output_path)
@@ -149,20 +283,20 @@ class DataDictionary(BaseModel):
         return output_path
 
     def format_context(self) -> str:
-        # context = "DATABASES:\n"
-        context = ""
-        for database in self.databases.values():
-            context += database.format_context()
+        return self.rendered_context
 
-        return context
+    @cached_property
+    def rendered_context(self) -> str:
+        # context = "DATABASES:\n"
+        return "".join(db.format_context() for db in self.databases.values())
 
 
-def init_data_dictionary():
-    engine = sa.create_engine(DB_CONNECTION_STRING)
-    inspector = sa.inspect(engine)
+def init_data_dictionary(engines: EngineRegistry | None = None):
+    if engines is None:
+        engines = init_engine_registry()
 
     db_schemas_dict = load_config(TABLES_FILE)
 
-    return DataDictionary.from_inspector(inspector, db_schemas_dict)
+    return DataDictionary.from_engines(engines, db_schemas_dict)
     # print(data_dictionary.format_context())
     # data_dictionary.save(None)
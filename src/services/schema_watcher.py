@@ -0,0 +1,126 @@
+import threading
+
+import sqlalchemy as sa
+
+from ..utils.consts import SCHEMA_POLL_INTERVAL
+from .engines import EngineRegistry
+from .schema_loader import DatabaseInfo, DataDictionary, SchemaInfo, TableInfo
+
+# One md5 per table over everything TableInfo is reflected from (columns, types,
+# nullability, comments, constraints, and the last ANALYZE behind its pg_stats
+# value hints). Reads the catalog only, never the tables.
+_FINGERPRINT_SQL = """
+SELECT c.relname, md5(concat_ws('|',
+    obj_description(c.oid, 'pg_class'),
+    pg_stat_get_last_analyze_time(c.oid),
+    pg_stat_get_last_autoanalyze_time(c.oid),
+    (SELECT string_agg(concat_ws(':', a.attname, format_type(a.atttypid, a.atttypmod),
+                                 a.attnotnull, col_description(c.oid, a.attnum)),
+                       ',' ORDER BY a.attnum)
+     FROM pg_attribute a
+     WHERE a.attrelid = c.oid AND a.attnum > 0 AND NOT a.attisdropped),
+    (SELECT string_agg(k.conname || pg_get_constraintdef(k.oid), ',' ORDER BY k.conname)
+     FROM pg_constraint k
+     WHERE k.conrelid = c.oid)
+))
+FROM pg_class c
+JOIN pg_namespace n ON n.oid = c.relnamespace
+WHERE n.nspname = :schema AND c.relkind IN ('r', 'p')
+"""
+
+
+class SchemaWatcher:
+    """Keeps the DataDictionary in sync with the databases without full reloads.
+
+    Every poll compares a per-table catalog fingerprint with the previous one,
+    re-reflects only the tables that changed and swaps a new DataDictionary in
+    with a single assignment. Unchanged TableInfo objects are reused as-is, so
+    their rendered context is not rebuilt.
+    """
+
+    def __init__(
+        self,
+        engines: EngineRegistry,
+        database_schema_dict: dict,
+        interval: float = SCHEMA_POLL_INTERVAL,
+    ):
+        self.engines = engines
+        self.database_schema_dict = database_schema_dict
+        self.interval = interval
+        self.version = 0
+
+        # Fingerprint before reflecting: a change in between is caught by the next poll
+        self._fingerprints = {
+            (db_name, schema_name): self._fingerprint(db_name, schema_name)
+            for db_name, schemas in database_schema_dict.items()
+            for schema_name in schemas
+        }
+        self.data_dict = DataDictionary.from_engines(engines, database_schema_dict)
+
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def _fingerprint(self, db_name: str, schema_name: str) -> dict[str, str]:
+        with self.engines.databases[db_name].primary.connect() as conn:
+            rows = conn.execute(sa.text(_FINGERPRINT_SQL), {"schema": schema_name})
+            return dict(rows.all())
+
+    def poll(self) -> dict[str, list[str]]:
+        """Refresh the changed tables, returning them per "database.schema" """
+        with self._lock:
+            changes = {}
+            databases = dict(self.data_dict.databases)
+            for (db_name, schema_name), previous in self._fingerprints.items():
+                current = self._fingerprint(db_name, schema_name)
+                changed = [t for t, md5 in current.items() if previous.get(t) != md5]
+                dropped = [t for t in previous if t not in current]
+                if not changed and not dropped:
+                    continue
+
+                inspector = sa.inspect(self.engines.databases[db_name].primary)
+                schema_info = databases[db_name].schemas[schema_name]
+                tables = dict(schema_info.tables)
+                for table_name in dropped:
+                    tables.pop(table_name, None)
+                for table_name in changed:
+                    tables[table_name] = TableInfo.from_inspector(
+                        inspector, table_name, schema_name
+                    )
+
+                databases[db_name] = DatabaseInfo(
+                    name=db_name,
+                    schemas={
+                        **databases[db_name].schemas,
+                        schema_name: SchemaInfo(name=schema_name, tables=tables),
+                    },
+                )
+                self._fingerprints[(db_name, schema_name)] = current
+                changes[f"{db_name}.{schema_name}"] = sorted(changed + dropped)
+
+            if changes:
+                self.data_dict = DataDictionary(databases=databases)
+                self.version += 1
+                print(f"Schema changes picked up (version {self.version}): {changes}")
+            return changes
+
+    def start(self):
+        if self._thread is not None or not self.interval:
+            return
+
+        def run():
+            while not self._stop.wait(self.interval):
+                try:
+                    self.poll()
+                except Exception as e:
+                    print(f"Schema poll failed: {e}")
+
+        self._stop.clear()
+        self._thread = threading.Thread(target=run, name="schema-watcher", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
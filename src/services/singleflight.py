@@ -0,0 +1,102 @@
+import copy
+import re
+import threading
+from collections.abc import Callable, Hashable
+from typing import Any
+
+from pydantic import BaseModel
+
+
+class FlightStats(BaseModel):
+    """Calls made vs. calls that joined one already in flight"""
+
+    executed: int = 0
+    coalesced: int = 0
+    in_flight: int = 0
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: BaseException | None = None
+
+
+class SingleFlight:
+    """Collapses concurrent calls sharing a key into one.
+
+    The first caller of a key runs the function; callers arriving before it
+    returns wait and get a deep copy of its result (or its exception), so no
+    two sessions share mutable state. Nothing is kept once the call returns:
+    this is coalescing, not caching.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._calls: dict[Hashable, _Call] = {}
+        self._lock = threading.Lock()
+        self._executed = 0
+        self._coalesced = 0
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> tuple[Any, bool]:
+        """Result of `fn`, and whether it came from another caller's call"""
+        with self._lock:
+            call = self._calls.get(key)
+            is_leader = call is None
+            if is_leader:
+                call = self._calls[key] = _Call()
+                self._executed += 1
+            else:
+                self._coalesced += 1
+
+        if not is_leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return copy.deepcopy(call.result), True
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result, False
+
+    @property
+    def stats(self) -> FlightStats:
+        with self._lock:
+            return FlightStats(
+                executed=self._executed,
+                coalesced=self._coalesced,
+                in_flight=len(self._calls),
+            )
+
+
+_QUOTED = re.compile(r"""('(?:[^']|'')*'|"[^"]*")""")
+
+
+def normalize_question(question: str) -> str:
+    """Case, whitespace and trailing punctuation insensitive form of a question.
+
+    Quoted text is kept as is: 'Completed' and 'completed' are different values.
+    """
+    parts = _QUOTED.split(question.strip())
+    parts[-1] = parts[-1].rstrip("?!. ")
+    return "".join(
+        part if i % 2 else re.sub(r"\s+", " ", part).lower()
+        for i, part in enumerate(parts)
+    )
+
+
+def canonical_sql(query: str) -> str:
+    """Formatting insensitive form of a query (as is if sqlglot cannot parse it)"""
+    from sqlglot import parse_one  # FlightStats is imported by the API at startup
+
+    try:
+        return parse_one(query, read="postgres").sql(dialect="postgres")
+    except Exception:
+        return query.strip().rstrip(";").strip()
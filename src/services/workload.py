@@ -0,0 +1,65 @@
+import json
+import threading
+from collections.abc import Iterator
+from datetime import datetime, timezone
+from pathlib import Path
+
+from pydantic import BaseModel
+
+from ..utils.consts import WORKLOAD_LOG_FILE
+
+
+class WorkloadRecord(BaseModel):
+    """One SQL statement executed by the agent"""
+
+    executed_at: datetime
+    sql: str
+    database: str | None = None
+    elapsed_ms: float
+    row_count: int | None = None
+    served_from_rollup: str | None = None
+    error: str | None = None
+
+
+class WorkloadLog:
+    """Append-only JSON lines log of the generated queries that were executed"""
+
+    def __init__(self, path: Path | str = WORKLOAD_LOG_FILE):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+
+    def record(
+        self,
+        sql: str,
+        elapsed_ms: float,
+        database: str | None = None,
+        row_count: int | None = None,
+        served_from_rollup: str | None = None,
+        error: str | None = None,
+    ) -> WorkloadRecord:
+        record = WorkloadRecord(
+            executed_at=datetime.now(timezone.utc),
+            sql=sql,
+            database=database,
+            elapsed_ms=elapsed_ms,
+            row_count=row_count,
+            served_from_rollup=served_from_rollup,
+            error=error,
+        )
+        try:
+            with self._lock:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                with self.path.open("a") as f:
+                    f.write(record.model_dump_json() + "\n")
+        except OSError as e:
+            print(f"Cannot write to the workload log: {e}")
+
+        return record
+
+    def __iter__(self) -> Iterator[WorkloadRecord]:
+        if not self.path.exists():
+            return
+        with self.path.open() as f:
+            for line in f:
+                if line.strip():
+                    yield WorkloadRecord(**json.loads(line))
@@ -18,5 +18,13 @@ UNSAFE_SQL_KW = [
 PROJECT_ROOT = Path(__file__).parent.parent.parent
 OUTPUT_SCHEMA_DIR = PROJECT_ROOT / "knowledge"
 TABLES_FILE = PROJECT_ROOT / "dataset" / "tables.yaml"
+ROLLUPS_FILE = PROJECT_ROOT / "dataset" / "rollups.yaml"
+WORKLOAD_LOG_FILE = PROJECT_ROOT / "logs" / "workload.jsonl"
+MODELS_FILE = Path(os.getenv("MODELS_FILE", PROJECT_ROOT / "prompts" / "models.yaml"))
 
 DB_CONNECTION_STRING = f"postgresql://{os.getenv('PGUSER')}:{os.getenv('PGPASSWORD')}@{os.getenv('PGHOST')}:{int(os.getenv('PGPORT'))}/{os.getenv('PGDATABASE')}"
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 5))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 10))
+SCHEMA_POLL_INTERVAL = float(os.getenv("SCHEMA_POLL_INTERVAL", 60))  # 0 disables
+SQL_STATEMENT_TIMEOUT_MS = int(os.getenv("SQL_STATEMENT_TIMEOUT_MS", 30_000))
+VALUE_HINTS_MAX_DISTINCT = int(os.getenv("VALUE_HINTS_MAX_DISTINCT", 20))
@@ -1,9 +1,12 @@
+import re
 from pathlib import Path
 
 import yaml
 from langchain_core.prompts import ChatPromptTemplate
 from sqlglot import ParseError, exp, parse_one
 
+from .consts import UNSAFE_SQL_KW
+
 
 class UnsafeQueryException(Exception):
     pass
@@ -49,6 +52,10 @@ def load_chat_prompt_template(
     )
 
 
+def _find_unsafe_keywords(query: str) -> list[str]:
+    return [kw for kw in UNSAFE_SQL_KW if re.search(rf"\b{kw}\b", query.upper())]
+
+
 def _validate_sql_syntax(query: str) -> bool:
     try:
         parsed_query = parse_one(query, read="postgres")
@@ -68,3 +75,20 @@ def _validate_sql_syntax(query: str) -> bool:
         print(error_messages.get(type(e), f"Unknown exception {str(e)}"))
 
         raise
+
+
+def _from_clause(select: exp.Select) -> exp.From | None:
+    # sqlglot renamed the arg key from "from" to "from_" across releases
+    return select.args.get("from_") or select.args.get("from")
+
+
+def _conjuncts(condition: exp.Expression | None) -> list[exp.Expression]:
+    """Split an AND chain into its individual predicates"""
+    if condition is None:
+        return []
+    if isinstance(condition, exp.Where):
+        condition = condition.this
+    condition = condition.unnest()
+    if isinstance(condition, exp.And):
+        return _conjuncts(condition.left) + _conjuncts(condition.right)
+    return [condition]
@@ -0,0 +1,4 @@
+import os
+
+# src.utils.consts builds the connection string at import time; no database is used
+os.environ.setdefault("PGPORT", "5432")
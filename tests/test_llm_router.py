@@ -0,0 +1,148 @@
+"""ModelRouter hedging, fallbacks, deadlines and circuit breakers on scripted models"""
+
+import pytest
+
+from src.services.llm_router import (
+    CircuitBreaker,
+    ModelConfig,
+    ModelRouteError,
+    ModelRouter,
+    RouteConfig,
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def make_router(primary: list[dict], secondary: list[dict], **route) -> ModelRouter:
+    return ModelRouter(
+        models={
+            "primary": ModelConfig(model_provider="fake", script=primary),
+            "secondary": ModelConfig(model_provider="fake", script=secondary),
+        },
+        routes={"route": RouteConfig(models=["primary", "secondary"], **route)},
+    )
+
+
+@pytest.fixture
+def routers():
+    created = []
+
+    def factory(*args, **kwargs) -> ModelRouter:
+        created.append(make_router(*args, **kwargs))
+        return created[-1]
+
+    yield factory
+    for router in created:
+        router.shutdown()
+
+
+def test_hedge_answers_when_the_primary_is_slow(routers):
+    router = routers(
+        [{"latency_s": 2.0, "response": "primary"}],
+        [{"latency_s": 0.05, "response": "secondary"}],
+        hedge_after_s=0.1,
+        deadline_s=5,
+    )
+    assert router.invoke("route", "question").content == "secondary"
+    stats = router.stats()["route"]
+    assert (stats.calls, stats.hedged, stats.hedge_wins) == (1, 1, 1)
+    assert stats.wins == {"secondary": 1}
+    assert stats.hedge_rate == 1.0
+
+
+def test_fast_primary_is_not_hedged(routers):
+    router = routers(
+        [{"latency_s": 0.01, "response": "primary"}],
+        [{"response": "secondary"}],
+        hedge_after_s=1,
+        deadline_s=5,
+    )
+    assert router.invoke("route", "question").content == "primary"
+    assert router.stats()["route"].hedged == 0
+
+
+def test_failed_primary_falls_back_without_waiting_for_the_hedge(routers):
+    router = routers(
+        [{"error": "503 Service Unavailable"}],
+        [{"response": "secondary"}],
+        hedge_after_s=10,
+        deadline_s=5,
+    )
+    assert router.invoke("route", "question").content == "secondary"
+    stats = router.stats()["route"]
+    assert (stats.fallbacks, stats.hedged, stats.failures) == (1, 0, 0)
+
+
+def test_every_model_failing_raises(routers):
+    router = routers([{"error": "boom"}], [{"error": "boom"}], deadline_s=5)
+    with pytest.raises(ModelRouteError):
+        router.invoke("route", "question")
+    assert router.stats()["route"].failures == 1
+
+
+def test_missed_deadline_raises_timeout(routers):
+    router = routers(
+        [{"latency_s": 1.0, "response": "primary"}],
+        [{"latency_s": 1.0, "response": "secondary"}],
+        hedge_after_s=0.05,
+        deadline_s=0.2,
+    )
+    with pytest.raises(TimeoutError):
+        router.invoke("route", "question")
+    stats = router.stats()["route"]
+    assert (stats.timeouts, stats.hedged) == (1, 1)
+
+
+def test_breaker_opens_half_opens_and_closes():
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=2, reset_after_s=30, clock=clock)
+
+    breaker.record_failure()
+    assert breaker.state == "closed" and breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open" and not breaker.allow()
+
+    clock.now = 30
+    assert breaker.state == "half_open"
+    assert breaker.allow()
+    assert not breaker.allow()  # a single trial call at a time
+    breaker.record_success()
+    assert breaker.state == "closed" and breaker.allow()
+
+
+def test_failed_trial_reopens_the_breaker():
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=1, reset_after_s=30, clock=clock)
+    breaker.record_failure()
+
+    clock.now = 30
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open"
+    clock.now = 59
+    assert not breaker.allow()
+    clock.now = 60
+    assert breaker.allow()
+
+
+def test_open_breaker_skips_the_model_until_its_trial_succeeds():
+    clock = FakeClock()
+    router = make_router(
+        [{"response": "primary"}], [{"response": "secondary"}], deadline_s=5
+    )
+    breaker = router.breakers["primary"] = CircuitBreaker(1, 30, clock=clock)
+    breaker.record_failure()
+
+    assert router.invoke("route", "question").content == "secondary"
+
+    clock.now = 30
+    assert router.invoke("route", "question").content == "primary"
+    router.shutdown(wait=True)  # let the trial's done callback settle the breaker
+    assert breaker.state == "closed"
+    assert router.stats()["route"].wins == {"secondary": 1, "primary": 1}
@@ -0,0 +1,165 @@
+"""Offline checks of the rollup query rewrite against dataset/rollups.yaml"""
+
+import pytest
+from sqlglot import parse_one
+from sqlglot.executor import execute
+
+from src.services.rollups import Rollup, RollupDefinition, _analyze, _NoMatch
+from src.utils.consts import ROLLUPS_FILE
+from src.utils.utils import load_config
+
+ORDERS_ITEMS = (
+    "FROM company_data.orders o "
+    "JOIN company_data.order_items oi ON oi.order_id = o.order_id"
+)
+
+
+@pytest.fixture(scope="module")
+def rollups() -> dict[str, Rollup]:
+    definitions = load_config(ROLLUPS_FILE)["rollups"]
+    return {d["name"]: Rollup(RollupDefinition(**d)) for d in definitions}
+
+
+def rewrite(rollup: Rollup, query: str) -> str:
+    return rollup.rewrite(_analyze(parse_one(query, read="postgres"))).sql(
+        dialect="postgres"
+    )
+
+
+def test_exact_match_reads_the_rollup_columns(rollups):
+    query = (
+        "SELECT DATE_TRUNC('month', o.order_date) AS month, o.order_status, "
+        f"SUM(oi.item_total) AS revenue {ORDERS_ITEMS} "
+        "GROUP BY DATE_TRUNC('month', o.order_date), o.order_status"
+    )
+    assert rewrite(rollups["rollup_revenue_by_month"], query) == (
+        "SELECT rlp.order_month AS month, rlp.order_status, rlp.revenue AS revenue "
+        "FROM company_data.rollup_revenue_by_month AS rlp"
+    )
+
+
+def test_fewer_dimensions_reaggregate_the_measures(rollups):
+    query = (
+        "SELECT o.order_status, SUM(oi.item_total) AS revenue, "
+        f"COUNT(oi.order_item_id) AS items {ORDERS_ITEMS} GROUP BY o.order_status"
+    )
+    assert rewrite(rollups["rollup_revenue_by_month"], query) == (
+        "SELECT rlp.order_status, SUM(rlp.revenue) AS revenue, "
+        "CAST(COALESCE(SUM(rlp.item_count), 0) AS BIGINT) AS items "
+        "FROM company_data.rollup_revenue_by_month AS rlp GROUP BY rlp.order_status"
+    )
+
+
+def test_dimension_filters_are_kept_across_several_predicates(rollups):
+    query = (
+        f"SELECT o.order_status, SUM(oi.item_total) AS revenue {ORDERS_ITEMS} "
+        "WHERE o.order_status = 'delivered' "
+        "AND DATE_TRUNC('month', o.order_date) >= '2024-01-01' "
+        "GROUP BY o.order_status"
+    )
+    assert rewrite(rollups["rollup_revenue_by_month"], query) == (
+        "SELECT rlp.order_status, SUM(rlp.revenue) AS revenue "
+        "FROM company_data.rollup_revenue_by_month AS rlp "
+        "WHERE rlp.order_status = 'delivered' AND rlp.order_month >= '2024-01-01' "
+        "GROUP BY rlp.order_status"
+    )
+
+
+def test_avg_is_served_per_group_but_not_reaggregated(rollups):
+    rollup = rollups["rollup_rating_by_product"]
+    assert rewrite(
+        rollup,
+        "SELECT r.product_id, AVG(r.rating) AS rating "
+        "FROM company_data.reviews r GROUP BY r.product_id",
+    ) == (
+        "SELECT rlp.product_id, rlp.avg_rating AS rating "
+        "FROM company_data.rollup_rating_by_product AS rlp"
+    )
+    with pytest.raises(_NoMatch):
+        rewrite(rollup, "SELECT AVG(r.rating) FROM company_data.reviews r")
+
+
+@pytest.mark.parametrize(
+    "query",
+    [
+        f"SELECT COUNT(*) {ORDERS_ITEMS}",
+        f"SELECT SUM(oi.item_total) * 1.0 / COUNT(*) {ORDERS_ITEMS}",
+        f"SELECT o.order_status, COUNT(1) {ORDERS_ITEMS} GROUP BY o.order_status",
+        f"SELECT o.order_status, SUM(oi.item_total) AS revenue {ORDERS_ITEMS} "
+        "GROUP BY o.order_status ORDER BY COUNT(*) DESC",
+        f"SELECT o.order_status {ORDERS_ITEMS} "
+        "GROUP BY o.order_status HAVING COUNT(*) > 10",
+        f"SELECT MAX(oi.item_total) {ORDERS_ITEMS}",
+    ],
+)
+def test_aggregates_that_are_not_measures_are_refused(rollups, query):
+    with pytest.raises(_NoMatch):
+        rewrite(rollups["rollup_revenue_by_month"], query)
+
+
+@pytest.fixture(scope="module")
+def reviews_rollup() -> Rollup:
+    return Rollup(
+        RollupDefinition(
+            name="rollup_reviews_by_product",
+            schema="company_data",
+            query="SELECT r.product_id AS product_id, COUNT(*) AS n_reviews "
+            "FROM company_data.reviews AS r GROUP BY r.product_id",
+        )
+    )
+
+
+def test_count_star_is_served_by_a_count_star_measure(reviews_rollup):
+    assert rewrite(reviews_rollup, "SELECT COUNT(*) FROM company_data.reviews r") == (
+        "SELECT CAST(COALESCE(SUM(rlp.n_reviews), 0) AS BIGINT) "
+        "FROM company_data.rollup_reviews_by_product AS rlp"
+    )
+
+
+def test_reaggregated_count_is_zero_over_no_rows(reviews_rollup):
+    query = rewrite(
+        reviews_rollup,
+        "SELECT COUNT(*) AS n FROM company_data.reviews r WHERE r.product_id = 7",
+    )
+    rows = [{"product_id": 1, "n_reviews": 3}]
+    result = execute(
+        query,
+        dialect="postgres",
+        tables={"company_data": {"rollup_reviews_by_product": rows}},
+    )
+    assert result.rows == [(0,)]
+
+
+def test_order_by_may_name_an_output_column(rollups):
+    query = (
+        f"SELECT o.order_status, SUM(oi.item_total) AS revenue {ORDERS_ITEMS} "
+        "GROUP BY o.order_status ORDER BY revenue DESC"
+    )
+    assert rewrite(rollups["rollup_revenue_by_month"], query).endswith(
+        "GROUP BY rlp.order_status ORDER BY revenue DESC"
+    )
+
+
+@pytest.mark.parametrize(
+    "query",
+    [
+        # filter on a column that is not a dimension
+        f"SELECT SUM(oi.item_total) {ORDERS_ITEMS} WHERE oi.quantity > 2",
+        f"SELECT o.order_status, SUM(oi.item_total) {ORDERS_ITEMS} "
+        "WHERE o.order_status = 'delivered' AND oi.quantity > 2 "
+        "GROUP BY o.order_status",
+        # group by a column that is not a dimension
+        f"SELECT o.customer_id, SUM(oi.item_total) {ORDERS_ITEMS} "
+        "GROUP BY o.customer_id",
+        # base-table column that shares its name with an output alias
+        f"SELECT o.order_status AS quantity, SUM(oi.item_total) {ORDERS_ITEMS} "
+        "WHERE oi.quantity > 2 GROUP BY o.order_status",
+        f"SELECT o.order_status AS quantity, SUM(oi.item_total) {ORDERS_ITEMS} "
+        "GROUP BY o.order_status ORDER BY oi.quantity",
+        # different join graph
+        "SELECT SUM(oi.item_total) FROM company_data.order_items oi",
+    ],
+)
+def test_queries_beyond_the_rollup_are_refused(rollups, query):
+    with pytest.raises(_NoMatch):
+        rewrite(rollups["rollup_revenue_by_month"], query)
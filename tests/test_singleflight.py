@@ -0,0 +1,62 @@
+import threading
+import time
+
+import pytest
+
+from src.services.singleflight import SingleFlight, canonical_sql, normalize_question
+
+
+def test_normalize_question_ignores_case_spacing_and_trailing_punctuation():
+    assert normalize_question("  Total   Revenue by MONTH?") == normalize_question(
+        "total revenue by month"
+    )
+
+
+def test_normalize_question_keeps_quoted_text():
+    assert normalize_question("Orders with status 'Completed'?") == (
+        "orders with status 'Completed'"
+    )
+    assert normalize_question("Orders with status 'Completed'") != normalize_question(
+        "Orders with status 'completed'"
+    )
+    assert normalize_question('Brand "ACME  Corp"') == 'brand "ACME  Corp"'
+
+
+def test_canonical_sql_ignores_formatting():
+    assert canonical_sql("select  a from t\nwhere x=1;") == canonical_sql(
+        "SELECT a FROM t WHERE x = 1"
+    )
+
+
+def test_concurrent_calls_share_one_execution():
+    flight, release, calls = SingleFlight("test"), threading.Event(), []
+
+    def slow():
+        calls.append(1)
+        release.wait(5)
+        return {"rows": [1, 2]}
+
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(flight.do("k", slow)))
+        for _ in range(5)
+    ]
+    for thread in threads:
+        thread.start()
+    while flight.stats.coalesced < 4:
+        time.sleep(0.01)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert sorted(shared for _, shared in results) == [False, True, True, True, True]
+    assert len({id(result) for result, _ in results}) == 5  # no shared state
+    assert flight.stats.in_flight == 0
+
+
+def test_errors_propagate_and_release_the_key():
+    flight = SingleFlight("test")
+    with pytest.raises(ValueError):
+        flight.do("k", lambda: (_ for _ in ()).throw(ValueError("boom")))
+    assert flight.stats.in_flight == 0